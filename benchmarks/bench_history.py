@@ -0,0 +1,134 @@
+"""
+Microbenchmark for per-turn overhead in Swarm.run as history grows.
+
+The completion client is faked and never reads the prompt, so the numbers
+only cover what Swarm itself does per turn (history bookkeeping, budget
+check, message conversion), not request serialization. The second table
+replays /chat turns of one conversation the way multi_agent does (load
+the stored history, run, store it compacted) and reports the cost of a
+turn as the conversation grows.
+
+Run from the repository root:
+    python -m benchmarks.bench_history
+"""
+import os
+import time
+import asyncio
+import tracemalloc
+from types import SimpleNamespace
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from openai.types.chat import ChatCompletionMessage
+
+from src.config import Config
+from src.services.agent import Agent, Swarm
+from src.services.history import HistoryManager
+
+CONVERSATION_TURNS = [100, 1_000, 3_000, 10_000]
+SHORT_RUN_TURNS = 20
+LONG_RUN_TURNS = 220
+REPEATS = 3
+HISTORY_SIZES = [100, 1_000, 10_000, 50_000]
+
+
+async def echo(text: str):
+    """Return the text unchanged."""
+    return text
+
+
+class FakeCompletions:
+    # Answers with a tool call until the last turn, then with plain text
+    def __init__(self, turns: int):
+        self.remaining = turns
+
+    async def create(self, **params):
+        self.remaining -= 1
+        if self.remaining:
+            tool_calls = [{
+                "id": f"call_{self.remaining}",
+                "type": "function",
+                "function": {"name": "echo", "arguments": '{"text": "ping"}'},
+            }]
+            message = ChatCompletionMessage(role="assistant", content=None, tool_calls=tool_calls)
+        else:
+            message = ChatCompletionMessage(role="assistant", content="done")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def history_manager() -> HistoryManager:
+    # The configured budget, so long histories go through the trimming path
+    return HistoryManager(
+        default_budget=Config.CONTEXT_BUDGET_TOKENS,
+        keep_recent=Config.HISTORY_KEEP_RECENT,
+        max_tool_chars=Config.HISTORY_MAX_TOOL_CHARS,
+    )
+
+
+def build_history(size: int) -> list:
+    history = []
+    for i in range(size // 2):
+        history.append({"role": "user", "content": f"question {i} about the market"})
+        history.append({"role": "assistant", "content": f"answer {i} " * 20, "sender": "Agent"})
+    return history
+
+
+async def run_once(history: list, turns: int) -> None:
+    client = SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions(turns)))
+    swarm = Swarm(client=client, history_manager=history_manager())
+    await swarm.run(agent=Agent(functions=[echo]), messages=history)
+
+
+async def chat_turns(count: int, sample: int = 50) -> float:
+    # Average ms of the last `sample` of `count` /chat turns on one conversation
+    swarm = Swarm(history_manager=history_manager())
+    agent = Agent(functions=[echo])
+    stored = []
+    for turn in range(count):
+        if turn == count - sample:
+            start = time.perf_counter()
+        swarm._client = SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions(2)))
+        messages = stored + [{"role": "user", "content": f"question {turn} about the market " * 5}]
+        response = await swarm.run(agent=agent, messages=messages)
+        stored = swarm.history_manager.compact(messages + response.messages)
+    return (time.perf_counter() - start) / sample * 1e3
+
+
+def measure(history: list, turns: int):
+    # Best wall time over a few repeats, then allocation peak in a traced run
+    elapsed = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        asyncio.run(run_once(history, turns))
+        elapsed = min(elapsed, time.perf_counter() - start)
+
+    tracemalloc.start()
+    asyncio.run(run_once(history, turns))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    print(f"{'history':>10} {'run setup ms':>13} {'us/turn':>10} {'KB/turn':>10}")
+    for size in HISTORY_SIZES:
+        history = build_history(size)
+
+        # The difference between a short and a long run is the marginal
+        # cost of one turn, separated from one-off per-run setup
+        short_time, short_peak = measure(history, SHORT_RUN_TURNS)
+        long_time, long_peak = measure(history, LONG_RUN_TURNS)
+        extra_turns = LONG_RUN_TURNS - SHORT_RUN_TURNS
+        per_turn = (long_time - short_time) / extra_turns
+        setup = short_time - per_turn * SHORT_RUN_TURNS
+        kb_per_turn = max(long_peak - short_peak, 0) / extra_turns / 1024
+
+        print(f"{size:>10} {setup * 1e3:>13.2f} {per_turn * 1e6:>10.1f} {kb_per_turn:>10.2f}")
+
+    print(f"\n{'chat turns':>10} {'ms/chat turn':>13}")
+    for count in CONVERSATION_TURNS:
+        print(f"{count:>10} {asyncio.run(chat_turns(count)):>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
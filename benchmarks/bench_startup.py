@@ -0,0 +1,80 @@
+"""
+Startup benchmark for the FastAPI entry point.
+
+Imports `src.main` in fresh interpreters with `-X importtime` and reports
+the median cumulative import time of the app's own modules and of the
+heaviest third-party packages. It also checks that the dependencies
+meant to load on first use (OpenAI, the Rivalz SDK, langchain) are not
+imported at startup, and exits non-zero if one is, so an eager import
+that creeps back in fails loudly.
+
+Run from the repository root:
+    python -m benchmarks.bench_startup
+"""
+import os
+import sys
+import statistics
+import subprocess
+from collections import defaultdict
+
+REPEATS = 5
+TOP_THIRD_PARTY = 8
+# Imported on first use only; seeing one at startup is a regression
+LAZY_MODULES = ["openai", "rivalz_client", "langchain_community"]
+
+CHECK_LAZY = (
+    "import sys, src.main; "
+    f"print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+)
+
+
+def environment() -> dict:
+    # Config requires these, but nothing is contacted during import
+    return {"OPENAI_API_KEY": "benchmark", "RIVALZ_SECRET_TOKEN": "benchmark", **os.environ}
+
+
+def import_times() -> dict:
+    # Cumulative microseconds per module for one cold import of src.main
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import src.main"],
+        capture_output=True, text=True, env=environment(), check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        module = name.strip()
+        times[module] = int(cumulative)
+    return times
+
+
+def main():
+    samples = defaultdict(list)
+    for _ in range(REPEATS):
+        for module, micros in import_times().items():
+            samples[module].append(micros)
+    median_ms = {module: statistics.median(values) / 1e3 for module, values in samples.items()}
+
+    print(f"{'module':<40} {'import ms':>10}")
+    print(f"{'src.main (total)':<40} {median_ms['src.main']:>10.1f}")
+    for module in sorted((m for m in median_ms if m.startswith("src.") and m != "src.main"), key=median_ms.get, reverse=True):
+        print(f"{module:<40} {median_ms[module]:>10.1f}")
+
+    top_level = [m for m in median_ms if "." not in m and m != "src"]
+    print()
+    for module in sorted(top_level, key=median_ms.get, reverse=True)[:TOP_THIRD_PARTY]:
+        print(f"{module:<40} {median_ms[module]:>10.1f}")
+
+    loaded = subprocess.run(
+        [sys.executable, "-c", CHECK_LAZY], capture_output=True, text=True, env=environment(), check=True,
+    ).stdout.strip()
+    print()
+    if loaded:
+        print(f"Imported at startup but meant to load lazily: {loaded}")
+        sys.exit(1)
+    print(f"Lazy dependencies not imported at startup: {', '.join(LAZY_MODULES)}")
+
+
+if __name__ == "__main__":
+    main()
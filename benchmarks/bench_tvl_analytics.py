@@ -0,0 +1,71 @@
+"""
+Benchmark for the TVL analytics over years of hourly snapshots.
+
+Builds a synthetic random-walk TVL matrix (one row per hour, one column
+per chain, some chains listed late) and times each vectorized primitive
+over the whole matrix, then appends and the agent-facing summaries. Over
+the whole matrix the primitives are slow (tens of ms for pct_change, a
+few hundred for ranks and dominance, about a second for zscores), which
+is why no tool runs them on it: the summaries apply them to the rows
+they report on only, and take about a millisecond.
+
+Run from the repository root:
+    python -m benchmarks.bench_tvl_analytics
+"""
+import time
+
+import numpy as np
+
+from src.services import tvl_analytics
+from src.services.tvl_analytics import TVLSeries
+
+YEARS = 3
+CHAINS = 400
+REPEATS = 5
+
+
+def build_series(hours: int, chains: int) -> TVLSeries:
+    rng = np.random.default_rng(0)
+    steps = rng.normal(0, 0.01, size=(hours, chains))
+    values = rng.lognormal(17, 3, size=chains) * np.exp(np.cumsum(steps, axis=0))
+    # Chains launched partway through have no earlier snapshots
+    launched = rng.integers(0, hours, size=chains) * (rng.random(chains) < 0.3)
+    values[np.arange(hours)[:, None] < launched] = np.nan
+    ts = 1_600_000_000 + np.arange(hours, dtype=np.int64) * 3600
+    return TVLSeries.from_arrays(ts, [f"chain-{i}" for i in range(chains)], values)
+
+
+def best_ms(func) -> float:
+    elapsed = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        func()
+        elapsed = min(elapsed, time.perf_counter() - start)
+    return elapsed * 1e3
+
+
+def main():
+    hours = YEARS * 365 * 24
+    series = build_series(hours, CHAINS)
+    values = series.window().values
+    tail = dict(zip(series.chains, values[-1]))
+    print(f"{hours} hourly snapshots x {CHAINS} chains ({values.nbytes / 2**20:.0f} MiB)\n")
+
+    cases = {
+        "pct_change (24h, all rows)": lambda: tvl_analytics.pct_change(values, 24),
+        "ranks (all rows)": lambda: tvl_analytics.ranks(values),
+        "dominance (all rows)": lambda: tvl_analytics.dominance(values),
+        "zscores (168h, all rows)": lambda: tvl_analytics.zscores(values, 168),
+        "append one snapshot": lambda: series.append(int(series.window().ts[-1]) + 3600, tail),
+        "market_structure (24h)": lambda: tvl_analytics.market_structure(series, 24),
+        "market_structure (full history)": lambda: tvl_analytics.market_structure(series, hours),
+        "chain_profile (full history)": lambda: tvl_analytics.chain_profile(series, "chain-7", hours),
+        "anomalies (168h)": lambda: tvl_analytics.anomalies(series, 168),
+    }
+    print(f"{'operation':<34} {'ms':>10}")
+    for name, func in cases.items():
+        print(f"{name:<34} {best_ms(func):>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
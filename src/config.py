@@ -1,8 +1,102 @@
 import os
+from pathlib import Path
 from dotenv import load_dotenv
 
 
 load_dotenv()
 
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
 class Config:
     RIVALZ_SECRET_TOKEN = os.getenv("RIVALZ_SECRET_TOKEN")
+
+    # OpenAI connection pool and concurrency limits used by Swarm
+    OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "100"))
+    OPENAI_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    OPENAI_KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "30"))
+    OPENAI_REQUEST_TIMEOUT = float(os.getenv("OPENAI_REQUEST_TIMEOUT", "60"))
+    OPENAI_MAX_CONCURRENT_COMPLETIONS = int(os.getenv("OPENAI_MAX_CONCURRENT_COMPLETIONS", "64"))
+
+    # Shared HTTP client for outbound tool calls (CoinGecko, DeFiLlama, ...)
+    HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
+    HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+    HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+    HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "10"))
+    HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "2"))
+    # Per-upstream client-side rate limits (requests per minute plus a small
+    # burst; callers wait up to UPSTREAM_MAX_WAIT seconds for a token) and a
+    # circuit breaker that opens after consecutive failures
+    COINGECKO_RATE_PER_MINUTE = float(os.getenv("COINGECKO_RATE_PER_MINUTE", "25"))
+    DEFILLAMA_RATE_PER_MINUTE = float(os.getenv("DEFILLAMA_RATE_PER_MINUTE", "120"))
+    UPSTREAM_BURST = float(os.getenv("UPSTREAM_BURST", "5"))
+    UPSTREAM_MAX_WAIT = float(os.getenv("UPSTREAM_MAX_WAIT", "2"))
+    CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+    CIRCUIT_RESET_SECONDS = float(os.getenv("CIRCUIT_RESET_SECONDS", "30"))
+
+    # Conversation sessions: "memory" or "sqlite" backend, evicted after TTL
+    SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory")
+    SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", "3600"))
+    SESSION_DB_PATH = Path(os.getenv("SESSION_DB_PATH", ROOT_DIR / "sessions.db"))
+
+    # Default token budget for the history sent with each completion
+    CONTEXT_BUDGET_TOKENS = int(os.getenv("CONTEXT_BUDGET_TOKENS", "16000"))
+    HISTORY_KEEP_RECENT = int(os.getenv("HISTORY_KEEP_RECENT", "6"))
+    HISTORY_MAX_TOOL_CHARS = int(os.getenv("HISTORY_MAX_TOOL_CHARS", "2000"))
+
+    # Fraction of runs traced as structured JSON logs; 0 disables tracing
+    TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0"))
+
+    # CoinGecko price cache: fresh for PRICE_CACHE_TTL seconds, then served
+    # stale for up to PRICE_CACHE_STALE_TTL more seconds if upstream fails
+    PRICE_CACHE_TTL = float(os.getenv("PRICE_CACHE_TTL", "20"))
+    PRICE_CACHE_STALE_TTL = float(os.getenv("PRICE_CACHE_STALE_TTL", "300"))
+    # Single-coin lookups arriving within this window share one upstream request
+    PRICE_BATCH_WINDOW = float(os.getenv("PRICE_BATCH_WINDOW", "0.025"))
+
+    # Symbol -> CoinGecko id index: memory-mapped snapshot, seeded from the
+    # shipped coin_list_cache.json and refreshed in the background
+    COIN_INDEX_PATH = Path(os.getenv("COIN_INDEX_PATH", ROOT_DIR / "coin_index.tsv"))
+    COIN_INDEX_SEED_PATH = Path(os.getenv("COIN_INDEX_SEED_PATH", ROOT_DIR / "coin_list_cache.json"))
+    COIN_INDEX_REFRESH_SECONDS = float(os.getenv("COIN_INDEX_REFRESH_SECONDS", "21600"))
+    # Pages of 250 coins from /coins/markets whose market cap rank breaks ticker ties
+    COIN_INDEX_RANKED_PAGES = int(os.getenv("COIN_INDEX_RANKED_PAGES", "4"))
+
+    # TVL snapshots from DeFiLlama, polled in the background into SQLite
+    TVL_DB_PATH = Path(os.getenv("TVL_DB_PATH", ROOT_DIR / "tvl.db"))
+    TVL_POLL_SECONDS = float(os.getenv("TVL_POLL_SECONDS", "900"))
+    # Hours of TVL history kept in memory for the analytics tools
+    TVL_ANALYTICS_HOURS = float(os.getenv("TVL_ANALYTICS_HOURS", str(24 * 365)))
+    # Hours of snapshots kept in SQLite; older ones are deleted as new ones arrive
+    TVL_RETENTION_HOURS = float(os.getenv("TVL_RETENTION_HOURS", str(24 * 400)))
+
+    # Web search for rivalz_network_info: "duckduckgo" or the offline "fixture"
+    SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "duckduckgo")
+    SEARCH_FIXTURE_PATH = Path(os.getenv("SEARCH_FIXTURE_PATH", ROOT_DIR / "fixtures" / "search_results.json"))
+    SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "3600"))
+    SEARCH_TIMEOUT = float(os.getenv("SEARCH_TIMEOUT", "8"))
+
+    # RAG context for query_rag_knowledge_base: "rivalz" (remote chat
+    # sessions) or "local" (on-disk vector index over RAG_DOCUMENTS_DIR)
+    RAG_BACKEND = os.getenv("RAG_BACKEND", "rivalz")
+    RAG_DOCUMENTS_DIR = Path(os.getenv("RAG_DOCUMENTS_DIR", ROOT_DIR / "src" / "documents"))
+    RAG_INDEX_DIR = Path(os.getenv("RAG_INDEX_DIR", ROOT_DIR / "rag_index"))
+    RAG_TOP_K = int(os.getenv("RAG_TOP_K", "4"))
+    # Rivalz ingestion: concurrent SDK calls, content-hash ledger of what was
+    # already sent and how long startup waits for the knowledge base to be ready
+    RAG_INGEST_WORKERS = int(os.getenv("RAG_INGEST_WORKERS", "4"))
+    RAG_LEDGER_PATH = Path(os.getenv("RAG_LEDGER_PATH", ROOT_DIR / "rag_ledger.json"))
+    RAG_READY_TIMEOUT = float(os.getenv("RAG_READY_TIMEOUT", "60"))
+    # Connect and read timeout of every Rivalz SDK request, which sets none itself
+    RIVALZ_TIMEOUT = float(os.getenv("RIVALZ_TIMEOUT", "20"))
+
+    # Answers to near-duplicate RAG questions are reused while the knowledge
+    # base is unchanged; similarity is cosine over query embeddings
+    RAG_ANSWER_CACHE_THRESHOLD = float(os.getenv("RAG_ANSWER_CACHE_THRESHOLD", "0.9"))
+    RAG_ANSWER_CACHE_SIZE = int(os.getenv("RAG_ANSWER_CACHE_SIZE", "1000"))
+    RAG_ANSWER_CACHE_TTL = float(os.getenv("RAG_ANSWER_CACHE_TTL", "86400"))
+
+    # Workers on one host elect a leader through a file lock; it ingests
+    # documents and refreshes caches, the others pick up what it publishes
+    LEADER_LOCK_PATH = Path(os.getenv("LEADER_LOCK_PATH", ROOT_DIR / "leader.lock"))
+    SHARED_STATE_PATH = Path(os.getenv("SHARED_STATE_PATH", ROOT_DIR / "shared_state.db"))
+    SHARED_STATE_SYNC_SECONDS = float(os.getenv("SHARED_STATE_SYNC_SECONDS", "5"))
@@ -1,17 +1,59 @@
+import json
+import uuid
+import asyncio
+import logging
+from typing import Optional
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 
 # from .user.router import router as query_router
 # from .user.services import initialize_rag_pipeline
 
-from .services.multi_agent import setup_rag_pipeline, call_multi_agent
+from .services.multi_agent import (
+    warm_up_rag_pipeline,
+    call_multi_agent,
+    stream_multi_agent,
+    evict_expired_sessions,
+    preload_completion_client,
+    close_clients,
+    refresh_coin_index_periodically,
+    poll_tvl_periodically,
+    get_metrics,
+    RAG_PIPELINE,
+)
+
+
 
+# Background work runs for the lifetime of the app; the RAG pipeline warms
+# up without blocking boot and everything is cancelled on shutdown
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    logging.info("Starting Rivalz AI Agents - Triage, On-Chain Operations, and Financial Analyst Agents")
+    tasks = [
+        asyncio.create_task(coroutine)
+        for coroutine in (
+            evict_expired_sessions(),
+            refresh_coin_index_periodically(),
+            poll_tvl_periodically(),
+            warm_up_rag_pipeline(),
+            preload_completion_client(),
+        )
+    ]
+    yield
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await close_clients()
 
 
 app = FastAPI(
     title="Rivalz RAG Multi-Agent API",
     description="API for Rivalz RAG Multi-Agent",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
 # <!-- Change python to src -->
@@ -28,16 +70,51 @@ app.add_middleware(
 # app.include_router(query_router)
 
 
-# Initialize RAG pipeline on startup
-@app.on_event("startup")
-async def startup_event():
-    await setup_rag_pipeline()
+@app.get("/health/live")
+async def health_live():
+    # The process is up and the event loop is responsive
+    return {"status": "ok"}
+
+
+@app.get("/health/ready")
+async def health_ready():
+    # Agents serve traffic while RAG warms up; "degraded" until it is ready
+    status = "ready" if RAG_PIPELINE["status"] == "ready" else "degraded"
+    return {"status": status, "rag": RAG_PIPELINE}
 
 
 @app.post("/chat")
-async def chat(message: str):
+async def chat(message: str, session_id: Optional[str] = None):
+    # Pass the returned session_id back to continue the same conversation
+    session_id = session_id or uuid.uuid4().hex
 
     # Call the multi-agent to generate a response
-    response = await call_multi_agent(message)
-    return {"response": response}
+    response = await call_multi_agent(message, session_id)
+    return {"response": response, "session_id": session_id}
+
+
+@app.get("/metrics")
+async def metrics():
+    # Cache hit/miss counters for outbound tool calls
+    return get_metrics()
+
+
+def format_sse(event: dict) -> str:
+    # One server-sent event per agent event, named after its type
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+# GET is allowed too so browsers can consume it with EventSource
+@app.api_route("/chat/stream", methods=["GET", "POST"])
+async def chat_stream(message: str, session_id: Optional[str] = None):
+    session_id = session_id or uuid.uuid4().hex
+
+    async def event_stream():
+        async for event in stream_multi_agent(message, session_id):
+            yield format_sse(event)
 
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
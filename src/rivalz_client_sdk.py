@@ -1,14 +1,49 @@
+from rivalz_client import client as rivalz_client_module
 from rivalz_client.client import RivalzClient
 import os
+import requests
 from typing import Dict, List, Optional, Union
 from pathlib import Path
 
+
+class TimeoutRequests:
+    """
+    Stands in for the `requests` module inside rivalz_client, whose calls
+    set no timeout, so a hung Rivalz request fails after `timeout` seconds
+    instead of holding its thread forever.
+    """
+
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+
+    def __getattr__(self, name):
+        return getattr(requests, name)
+
+    def request(self, method: str, url: str, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return requests.request(method, url, **kwargs)
+
+    def get(self, url: str, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url: str, **kwargs):
+        return self.request("PUT", url, **kwargs)
+
+    def delete(self, url: str, **kwargs):
+        return self.request("DELETE", url, **kwargs)
+
+
 class RivalzClientSdk:
     MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
 
-    def __init__(self, secret_token: str):
+    def __init__(self, secret_token: str, timeout: Optional[float] = 20):
         if not secret_token:
             raise ValueError("SECRET_TOKEN is required")
+        if timeout:
+            rivalz_client_module.requests = TimeoutRequests(timeout)
         self.sdk = RivalzClient(secret_token)
 
     def _validate_file_size(self, file_path: str) -> int:
@@ -1,9 +1,10 @@
 import json
-import copy
+import typing
 import inspect
+import functools
 
-from openai import OpenAI
-from pydantic import BaseModel
+import httpx
+from pydantic import BaseModel, PrivateAttr
 from typing_extensions import Literal
 from typing import Union, Callable, List, Optional
 
@@ -30,8 +31,12 @@ def pretty_print_messages(messages) -> None:
             arg_str = json.dumps(json.loads(args)).replace(":", "=")
             print(f"\033[95m{name}\033[0m({arg_str[1:-1]})")
 
+@functools.lru_cache(maxsize=None)
 def function_to_json(func) -> dict:
     """
+    The schema is memoized per function object, so the returned dict is
+    shared and must not be mutated by callers.
+
     Sample Input:
     def add_two_numbers(a: int, b: int) -> int:
         # Adds two numbers together
@@ -64,6 +69,13 @@ def function_to_json(func) -> dict:
         type(None): "null",
     }
 
+    def param_schema(annotation) -> dict:
+        # Lists become arrays; typed lists (List[str], list[int]) also describe their items
+        if annotation is list or typing.get_origin(annotation) is list:
+            item_types = typing.get_args(annotation)
+            return {"type": "array", "items": param_schema(item_types[0]) if item_types else {}}
+        return {"type": type_map.get(annotation, "string")}
+
     try:
         signature = inspect.signature(func)
     except ValueError as e:
@@ -74,12 +86,11 @@ def function_to_json(func) -> dict:
     parameters = {}
     for param in signature.parameters.values():
         try:
-            param_type = type_map.get(param.annotation, "string")
+            parameters[param.name] = param_schema(param.annotation)
         except KeyError as e:
             raise KeyError(
                 f"Unknown type annotation {param.annotation} for parameter {param.name}: {str(e)}"
             )
-        parameters[param.name] = {"type": param_type}
 
     required = [
         param.name
@@ -110,6 +121,19 @@ class Agent(BaseModel):
     functions: List[AgentFunction] = []
     tool_choice: str = None
     parallel_tool_calls: bool = True
+    context_budget: Optional[int] = None  # Token budget for prompt history; falls back to the Swarm default
+
+    # Precompiled tools payload and the function list it was built from
+    _tools_key: tuple = PrivateAttr(default=())
+    _tools: list = PrivateAttr(default_factory=list)
+
+    def get_tools(self) -> List[dict]:
+        # Rebuilt only when `functions` is reassigned or mutated (e.g. .append)
+        key = tuple(self.functions)
+        if key != self._tools_key:
+            self._tools = [function_to_json(f) for f in self.functions]
+            self._tools_key = key
+        return self._tools
 
 class Response(BaseModel):
     # Response is used to encapsulate the entire conversation output
@@ -132,25 +156,112 @@ class Result(BaseModel):
 
 
 import asyncio
-import copy
 import json
+import logging
+import functools
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import List
 
+from src.services.history import History, HistoryManager, Prompt
+from src.services.tracing import Tracer
+
+
+def message_to_dict(message, sender: str) -> dict:
+    # Read the completion message fields directly instead of a
+    # model_dump_json()/json.loads() round-trip
+    tool_calls = None
+    if message.tool_calls:
+        tool_calls = [
+            {
+                "id": tool_call.id,
+                "type": tool_call.type,
+                "function": {
+                    "name": tool_call.function.name,
+                    "arguments": tool_call.function.arguments,
+                },
+            }
+            for tool_call in message.tool_calls
+        ]
+    return {
+        "role": message.role,
+        "content": message.content,
+        "sender": sender,
+        "tool_calls": tool_calls,
+    }
+
 class Swarm:
     # Implements the core logic of orchestrating a single/multi-agent system
-    def __init__(self, client=None):
-        if not client:
-            client = OpenAI()  # Assuming OpenAI is async-compatible
-        self.client = client
+    def __init__(
+        self,
+        client=None,
+        tool_timeout: float = 30.0,
+        max_tool_workers: int = 16,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        request_timeout: float = 60.0,
+        max_concurrent_completions: int = 64,
+        history_manager: HistoryManager = None,
+        tracer: Tracer = None,
+    ):
+        # Built on first use by the `client` property when not given
+        self._client = client
+        self._http_limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._request_timeout = request_timeout
+        self._client_lock = threading.Lock()
+        # Trims history to each agent's context budget before every completion
+        self.history_manager = history_manager or HistoryManager()
+        # Spans per run, completion and tool call; no-op unless configured
+        self.tracer = tracer or Tracer()
+        # Caps how many completions are in flight at once across all requests
+        self.completion_semaphore = asyncio.Semaphore(max_concurrent_completions)
+        # Seconds a single tool call may run before it is reported as timed out
+        self.tool_timeout = tool_timeout
+        # Bounded pool for sync tools so they never block the event loop
+        self.tool_executor = ThreadPoolExecutor(
+            max_workers=max_tool_workers, thread_name_prefix="swarm-tool"
+        )
+
+    @property
+    def client(self):
+        # openai is the slowest import of the app, so it is deferred to the
+        # first completion instead of slowing down every worker's startup
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    from openai import AsyncOpenAI
+
+                    # One pooled, keep-alive HTTP client shared by every completion
+                    http_client = httpx.AsyncClient(limits=self._http_limits, timeout=self._request_timeout)
+                    self._client = AsyncOpenAI(http_client=http_client)
+        return self._client
+
+    async def close(self) -> None:
+        # Release the completion connections and tool threads on shutdown
+        if self._client is not None:
+            await self._client.close()
+        self.tool_executor.shutdown(wait=False)
 
     async def get_chat_completion(
             self,
             agent: Agent,
-            history: List,
-            model_override: str
+            history: History,
+            model_override: str,
+            stream: bool = False,
         ):
-            messages = [{"role": "system", "content": agent.instructions}] + history
-            tools = [function_to_json(f) for f in agent.functions]
+            history = self.history_manager.fit(
+                history,
+                agent.context_budget or self.history_manager.default_budget,
+                system=agent.instructions,
+            )
+            messages = Prompt({"role": "system", "content": agent.instructions}, history)
+            tools = agent.get_tools()
             
             create_params = {
                 "model": model_override or agent.model,
@@ -162,8 +273,37 @@ class Swarm:
             if tools:
                 create_params["parallel_tool_calls"] = agent.parallel_tool_calls
 
-            # Wrap the synchronous API call with asyncio.to_thread
-            return await asyncio.to_thread(self.client.chat.completions.create, **create_params)
+            if stream:
+                create_params["stream"] = True
+
+            create = self.client.chat.completions.create
+            with self.tracer.span(
+                "swarm.completion",
+                agent=agent.name,
+                model=create_params["model"],
+                prompt_messages=len(messages),
+                stream=stream,
+            ) as span:
+                async with self.completion_semaphore:
+                    # Async clients are awaited natively; a sync client passed in
+                    # by the caller still works through a worker thread. The
+                    # openai SDK wraps `create` in a plain-def decorator, so
+                    # look through the wrapper, and await whatever comes back
+                    # awaitable in case a wrapper still hides the coroutine
+                    if asyncio.iscoroutinefunction(inspect.unwrap(create)):
+                        completion = await create(**create_params)
+                    else:
+                        completion = await asyncio.to_thread(create, **create_params)
+                        if inspect.isawaitable(completion):
+                            completion = await completion
+
+                usage = getattr(completion, "usage", None)
+                if usage:
+                    span.set(
+                        prompt_tokens=usage.prompt_tokens,
+                        completion_tokens=usage.completion_tokens,
+                    )
+                return completion
 
 
     def handle_function_result(self, result) -> Result:
@@ -181,45 +321,104 @@ class Swarm:
                 except Exception as e:
                     raise TypeError(e)
 
+    async def call_tool(self, func: AgentFunction, args: dict):
+        """
+        Run one tool with `tool_timeout`. Async tools run on the loop, sync
+        tools in the bounded thread pool, with the context copied so context
+        variables stay visible inside the tool.
+
+        A timed-out async tool is cancelled, but a thread cannot be: a timed
+        out sync tool keeps running, and holding a pool worker, until its
+        blocking call returns. Sync tools must therefore bound their own I/O
+        (the shared HTTPClient and the Rivalz SDK wrapper set timeouts).
+        """
+        if asyncio.iscoroutinefunction(func):
+            call = func(**args)
+        else:
+            loop = asyncio.get_running_loop()
+            ctx = contextvars.copy_context()
+            call = loop.run_in_executor(
+                self.tool_executor, functools.partial(ctx.run, func, **args)
+            )
+        return await asyncio.wait_for(call, timeout=self.tool_timeout)
+
+    async def execute_tool_call(
+        self,
+        tool_call: ChatCompletionMessageToolCall,
+        function_map: dict,
+        on_event: Optional[Callable[[dict], None]] = None,
+    ) -> Result:
+        name = tool_call.function.name
+        if on_event:
+            on_event({"type": "tool_call_start", "tool_call_id": tool_call.id, "name": name})
+
+        result = await self.run_tool_call(tool_call, function_map)
+
+        if on_event:
+            on_event({
+                "type": "tool_call_end",
+                "tool_call_id": tool_call.id,
+                "name": name,
+                "content": result.value,
+            })
+        return result
+
+    async def run_tool_call(
+        self,
+        tool_call: ChatCompletionMessageToolCall,
+        function_map: dict,
+    ) -> Result:
+        name = tool_call.function.name
+        # Handle missing tool case
+        if name not in function_map:
+            return Result(value=f"Error: Tool {name} not found.")
+        # Bad arguments or a failing tool only fail this call, as a message
+        # the model can react to; the other calls in the batch still complete
+        try:
+            args = json.loads(tool_call.function.arguments or "{}")
+        except ValueError as e:
+            return Result(value=f"Error: Invalid arguments for tool {name}: {e}")
+        if not isinstance(args, dict):
+            return Result(value=f"Error: Invalid arguments for tool {name}: expected a JSON object.")
+
+        with self.tracer.span("swarm.tool", tool=name, args_chars=len(tool_call.function.arguments or "")) as span:
+            try:
+                raw_result = await self.call_tool(function_map[name], args)
+                result = self.handle_function_result(raw_result)
+            except asyncio.TimeoutError:
+                span.set(timed_out=True)
+                return Result(value=f"Error: Tool {name} timed out after {self.tool_timeout}s.")
+            except Exception as e:
+                logging.exception(f"Tool {name} failed")
+                span.set(error=type(e).__name__)
+                return Result(value=f"Error: Tool {name} failed: {e}")
+
+            span.set(result_chars=len(result.value), handoff=result.agent.name if result.agent else None)
+            return result
+
     async def handle_tool_calls(
         self,
         tool_calls: List[ChatCompletionMessageToolCall],
-        functions: List[AgentFunction]
+        functions: List[AgentFunction],
+        on_event: Optional[Callable[[dict], None]] = None,
     ) -> Response:
         function_map = {f.__name__: f for f in functions}
         partial_response = Response(messages=[], agent=None)
 
-        for tool_call in tool_calls:
-            name = tool_call.function.name
-            # Handle missing tool case, skip to the next tool
-            if name not in function_map:
-                partial_response.messages.append(
-                    {
-                        "role": "tool",
-                        "tool_call_id": tool_call.id,
-                        "tool_name": name,
-                        "content": f"Error: Tool {name} not found.",
-                    }
-                )
-                continue
-            args = json.loads(tool_call.function.arguments)
-
-            # Support async tools
-            func = function_map[name]
-            if asyncio.iscoroutinefunction(func):
-                raw_result = await func(**args)
-            else:
-                raw_result = func(**args)
-
-            print(f'Called function {name} with args: {args} and obtained result: {raw_result}')
-            print('#############################################')
+        # Run the whole batch concurrently; gather keeps the model's tool_call order
+        results = await asyncio.gather(
+            *(
+                self.execute_tool_call(tool_call, function_map, on_event)
+                for tool_call in tool_calls
+            )
+        )
 
-            result: Result = self.handle_function_result(raw_result)
+        for tool_call, result in zip(tool_calls, results):
             partial_response.messages.append(
                 {
                     "role": "tool",
                     "tool_call_id": tool_call.id,
-                    "tool_name": name,
+                    "tool_name": tool_call.function.name,
                     "content": result.value,
                 }
             )
@@ -235,48 +434,134 @@ class Swarm:
         model_override: str = None,
         max_turns: int = float("inf"),
         execute_tools: bool = True,
+        stream: bool = False,
     ) -> Response:
+        # With stream=True the awaited result is an async generator of events
+        if stream:
+            return self.run_and_stream(
+                agent=agent,
+                messages=messages,
+                model_override=model_override,
+                max_turns=max_turns,
+                execute_tools=execute_tools,
+            )
+
         active_agent = agent
-        history = copy.deepcopy(messages)
-        init_len = len(messages)
+        history = History(messages)
+
+        with self.tracer.span("swarm.run", agent=agent.name, history_messages=len(messages)) as span:
+            while len(history.tail) < max_turns and active_agent:
+                # Await chat completion
+                completion = await self.get_chat_completion(
+                    agent=active_agent,
+                    history=history,
+                    model_override=model_override
+                )
+                message = completion.choices[0].message
+                history.append(message_to_dict(message, active_agent.name))
+
+                if not message.tool_calls or not execute_tools:
+                    break
+
+                # Await tool call handling
+                partial_response = await self.handle_tool_calls(message.tool_calls, active_agent.functions)
+                history.extend(partial_response.messages)
+
+                if partial_response.agent:
+                    active_agent = partial_response.agent
+
+            span.set(
+                new_messages=len(history.tail),
+                final_agent=active_agent.name if active_agent else None,
+            )
+
+        return Response(
+            messages=history.tail,
+            agent=active_agent,
+        )
+
 
-        print('#############################################')
-        print(f'history: {history}')
-        print('#############################################')
+    async def run_and_stream(
+        self,
+        agent: Agent,
+        messages: List,
+        model_override: str = None,
+        max_turns: int = float("inf"),
+        execute_tools: bool = True,
+    ):
+        # Same loop as run(), but yields events as they happen:
+        # token deltas, tool call start/end, agent handoffs and a final "done"
+        active_agent = agent
+        history = History(messages)
 
-        while len(history) - init_len < max_turns and active_agent:
-            # Await chat completion
+        while len(history.tail) < max_turns and active_agent:
             completion = await self.get_chat_completion(
                 agent=active_agent,
                 history=history,
-                model_override=model_override
+                model_override=model_override,
+                stream=True,
             )
-            message = completion.choices[0].message
-            message.sender = active_agent.name
-            print(f'Active agent: {active_agent.name}')
-            print(f"message: {message}")
-            print('#############################################')
 
-            history.append(json.loads(message.model_dump_json()))
-
-            if not message.tool_calls or not execute_tools:
-                print('No tool calls hence breaking')
-                print('#############################################')
+            content = ""
+            tool_calls = {}
+            async for chunk in completion:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta
+                if delta.content:
+                    content += delta.content
+                    yield {"type": "delta", "sender": active_agent.name, "content": delta.content}
+                # Tool calls arrive in fragments keyed by their index
+                for fragment in delta.tool_calls or []:
+                    tool_call = tool_calls.setdefault(
+                        fragment.index,
+                        {"id": "", "type": "function", "function": {"name": "", "arguments": ""}},
+                    )
+                    if fragment.id:
+                        tool_call["id"] = fragment.id
+                    if fragment.function and fragment.function.name:
+                        tool_call["function"]["name"] += fragment.function.name
+                    if fragment.function and fragment.function.arguments:
+                        tool_call["function"]["arguments"] += fragment.function.arguments
+
+            tool_calls = [tool_calls[index] for index in sorted(tool_calls)]
+            history.append({
+                "role": "assistant",
+                "content": content or None,
+                "sender": active_agent.name,
+                "tool_calls": tool_calls or None,
+            })
+
+            if not tool_calls or not execute_tools:
                 break
 
-            # Await tool call handling
-            partial_response = await self.handle_tool_calls(message.tool_calls, active_agent.functions)
+            # Forward tool events from the concurrent batch while it runs
+            events = asyncio.Queue()
+            task = asyncio.ensure_future(self.handle_tool_calls(
+                [ChatCompletionMessageToolCall(**tool_call) for tool_call in tool_calls],
+                active_agent.functions,
+                on_event=events.put_nowait,
+            ))
+            task.add_done_callback(lambda _: events.put_nowait(None))
+            try:
+                while (event := await events.get()) is not None:
+                    yield event
+            finally:
+                # The consumer went away (e.g. client disconnect)
+                if not task.done():
+                    task.cancel()
+
+            partial_response = task.result()
             history.extend(partial_response.messages)
 
             if partial_response.agent:
                 active_agent = partial_response.agent
-                message.sender = active_agent.name
-            
-        return Response(
-            messages=history[init_len:],
-            agent=active_agent,
-        )
+                yield {"type": "handoff", "agent": active_agent.name}
 
+        yield {
+            "type": "done",
+            "response": Response(messages=history.tail, agent=active_agent),
+        }
 
 # class Swarm:
 #     # Implements the core logic of orchestrating a single/multi-agent system
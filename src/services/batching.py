@@ -0,0 +1,94 @@
+import time
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Iterable, List
+
+
+class MicroBatcher:
+    """
+    Merges single-key lookups that arrive within `window` seconds into one
+    call to `fetch_many(keys) -> {key: value}` and fans the results back
+    out to the waiting callers. `get_many()` adds several keys at once.
+
+    The first caller of a batch waits out the window and then flushes it;
+    a batch that reaches `max_batch` keys is flushed immediately. Keys
+    missing from the result raise KeyError for their callers, and an error
+    from `fetch_many` is raised for every caller in the batch.
+    """
+
+    def __init__(
+        self,
+        fetch_many: Callable[[List[Hashable]], Dict[Hashable, Any]],
+        window: float = 0.025,
+        max_batch: int = 100,
+    ):
+        self.fetch_many = fetch_many
+        self.window = window
+        self.max_batch = max_batch
+        self._batch = None
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "batches": 0}
+
+    def get(self, key: Hashable) -> Any:
+        return self._submit([key])[key].result()
+
+    def get_many(self, keys: Iterable[Hashable]) -> Dict[Hashable, Any]:
+        # Values for several keys, sharing batches with concurrent get() calls;
+        # keys without a value are left out
+        results = {}
+        for key, future in self._submit(keys).items():
+            try:
+                results[key] = future.result()
+            except KeyError:
+                pass
+        return results
+
+    def _submit(self, keys: Iterable[Hashable]) -> Dict[Hashable, Future]:
+        futures = {}
+        led = None
+        for key in keys:
+            with self._lock:
+                batch = self._batch
+                if batch is None:
+                    batch = led = self._batch = {}
+                future = batch.get(key)
+                if future is None:
+                    future = batch[key] = Future()
+                futures[key] = future
+                self._stats["requests"] += 1
+                full = len(batch) >= self.max_batch
+                if full:
+                    self._batch = None
+            if full:
+                self._flush(batch)
+
+        if led is not None:
+            # The caller that opened a batch waits out the window and flushes it
+            time.sleep(self.window)
+            with self._lock:
+                # The batch may already have been flushed for being full
+                pending = self._batch is led
+                if pending:
+                    self._batch = None
+            if pending:
+                self._flush(led)
+        return futures
+
+    def _flush(self, batch: Dict[Hashable, Future]) -> None:
+        with self._lock:
+            self._stats["batches"] += 1
+        try:
+            results = self.fetch_many(list(batch))
+        except Exception as error:
+            for future in batch.values():
+                future.set_exception(error)
+            return
+        for key, future in batch.items():
+            if key in results:
+                future.set_result(results[key])
+            else:
+                future.set_exception(KeyError(key))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
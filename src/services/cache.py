@@ -0,0 +1,115 @@
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+
+class TTLCache:
+    """
+    Thread-safe TTL cache with single-flight loading.
+
+    Concurrent misses for the same key share one call to the loader. If a
+    reload fails while an expired value is still within `stale_ttl`, the
+    stale value is served instead of the error. `get_or_load_many()` does
+    the same for several keys with one loader call. With `maxsize` set, the
+    least recently used entry is evicted first.
+    """
+
+    def __init__(self, ttl: float, stale_ttl: float = 0, maxsize: Optional[int] = None):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "coalesced": 0, "stale": 0, "errors": 0}
+
+    def get(self, key: Hashable, allow_stale: bool = False) -> Optional[Any]:
+        # Cached value without loading; None when missing or expired
+        with self._lock:
+            entry = self._entries.get(key)
+            age = time.monotonic() - entry[1] if entry else None
+            if entry and age < self.ttl:
+                self._stats["hits"] += 1
+                return entry[0]
+            if entry and allow_stale and age < self.ttl + self.stale_ttl:
+                self._stats["stale"] += 1
+                return entry[0]
+            return None
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._store(key, value)
+
+    def get_or_load(self, key: Hashable, loader: Callable[[Hashable], Any]) -> Any:
+        values, errors = self.get_or_load_many([key], lambda keys: {key: loader(key)})
+        if key in errors:
+            raise errors[key]
+        return values[key]
+
+    def get_or_load_many(
+        self, keys: Iterable[Hashable], loader: Callable[[List[Hashable]], Dict[Hashable, Any]]
+    ) -> Tuple[Dict[Hashable, Any], Dict[Hashable, Exception]]:
+        """
+        Look up several keys with one `loader(keys) -> {key: value}` call
+        for the misses no other thread is loading yet, and wait for the
+        ones it is. Returns the values and the errors by key; a key the
+        loader leaves out gets a KeyError.
+        """
+        now = time.monotonic()
+        values, errors, waiting, owned = {}, {}, {}, {}
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                entry = self._entries.get(key)
+                if entry and now - entry[1] < self.ttl:
+                    self._stats["hits"] += 1
+                    self._entries.move_to_end(key)
+                    values[key] = entry[0]
+                elif key in self._inflight:
+                    # Another thread is already loading this key
+                    self._stats["coalesced"] += 1
+                    waiting[key] = self._inflight[key]
+                else:
+                    self._stats["misses"] += 1
+                    owned[key] = (self._inflight.setdefault(key, Future()), entry)
+
+        if owned:
+            try:
+                loaded, error = loader(list(owned)), None
+            except Exception as e:
+                loaded, error = {}, e
+            with self._lock:
+                for key, (_, entry) in owned.items():
+                    del self._inflight[key]
+                    if key in loaded:
+                        self._store(key, loaded[key])
+                        values[key] = loaded[key]
+                    elif error and entry and now - entry[1] < self.ttl + self.stale_ttl:
+                        self._stats["stale"] += 1
+                        values[key] = entry[0]
+                    else:
+                        self._stats["errors"] += 1
+                        errors[key] = error or KeyError(key)
+            for key, (future, _) in owned.items():
+                if key in values:
+                    future.set_result(values[key])
+                else:
+                    future.set_exception(errors[key])
+
+        for key, future in waiting.items():
+            try:
+                values[key] = future.result()
+            except Exception as e:
+                errors[key] = e
+        return values, errors
+
+    def _store(self, key: Hashable, value: Any) -> None:
+        self._entries[key] = (value, time.monotonic())
+        self._entries.move_to_end(key)
+        if self.maxsize and len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "size": len(self._entries)}
@@ -0,0 +1,196 @@
+import os
+import json
+import mmap
+import time
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+from src.services.http import HTTPClient
+from src.services.storage import atomic_write
+from src.services.coin_resolver import UNRANKED, CoinResolver
+
+COIN_LIST_URL = "https://api.coingecko.com/api/v3/coins/list"
+COIN_MARKETS_URL = "https://api.coingecko.com/api/v3/coins/markets"
+
+
+def write_snapshot(path: Path, entries: Iterable[Tuple[str, str, str, Optional[int]]]) -> None:
+    """
+    Atomically write (symbol, coin id, name, market cap rank) rows as a
+    tab-separated snapshot sorted by symbol, best rank first within a
+    symbol. Readers never see a partially written file.
+    """
+    rows = sorted(
+        (symbol.upper().encode(), rank or UNRANKED, coin_id, name)
+        for symbol, coin_id, name, rank in entries
+        if symbol and coin_id and not any(c in f"{symbol}{coin_id}{name}" for c in "\t\n")
+    )
+    lines = [
+        b"%s\t%s\t%s\t%s\n" % (symbol, coin_id.encode(), name.encode(), b"" if rank == UNRANKED else b"%d" % rank)
+        for symbol, rank, coin_id, name in rows
+    ]
+    atomic_write(path, b"".join(lines))
+
+
+def read_rows(data: bytes):
+    # Yields (symbol, coin id, name, rank); older two-column snapshots get
+    # a name derived from the id and no rank
+    for line in data.decode().splitlines():
+        fields = line.split("\t")
+        symbol, coin_id = fields[0], fields[1]
+        name = fields[2] if len(fields) > 2 and fields[2] else coin_id.replace("-", " ")
+        rank = int(fields[3]) if len(fields) > 3 and fields[3] else UNRANKED
+        yield symbol, coin_id, name, rank
+
+
+class CoinIndex:
+    """
+    Symbol to CoinGecko id index backed by a memory-mapped snapshot.
+
+    The snapshot is sorted by symbol, so exact lookups binary-search the
+    mapped file directly and nothing is parsed at startup; the file is
+    opened on first use. When the snapshot is missing it is built once
+    from the JSON seed shipped with the repo, plus the `pinned` majors
+    ranked in their given order. The seed has no names, ranks or shared
+    tickers, so a snapshot built from it is dated in the past and the
+    first refresh runs at once. `build_resolver()` precomputes the
+    name-aware fuzzy resolver, and `refresh()` downloads the coin list
+    and market cap ranks, rewrites the snapshot atomically and swaps in
+    the new data. Both are meant for a background task, never for the
+    request path.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        seed_path: Optional[Path] = None,
+        http: Optional[HTTPClient] = None,
+        pinned: Optional[Dict[str, str]] = None,
+    ):
+        self.path = Path(path)
+        self.seed_path = Path(seed_path) if seed_path else None
+        self.pinned = pinned or {}
+        self.http = http or HTTPClient()
+        self._map = None
+        self._load_lock = threading.Lock()
+        # (mtime, inode) of the loaded snapshot, to notice another process replacing it
+        self._loaded = None
+        self.resolver: Optional[CoinResolver] = None
+
+    @property
+    def _data(self):
+        # Loaded (and built from the seed) on first use, so importing creates no file
+        if self._map is None:
+            with self._load_lock:
+                if self._map is None:
+                    self.load()
+        return self._map
+
+    def load(self) -> None:
+        if not self.path.exists() and self.seed_path and self.seed_path.exists():
+            with open(self.seed_path) as f:
+                seed = json.load(f)
+            entries = [(symbol, coin_id, coin_id.replace("-", " "), None) for symbol, coin_id in seed.items()]
+            entries += [
+                (symbol, coin_id, coin_id.replace("-", " "), rank)
+                for rank, (symbol, coin_id) in enumerate(self.pinned.items(), start=1)
+            ]
+            write_snapshot(self.path, entries)
+            # Stale from the start, so the first refresh replaces it right away
+            os.utime(self.path, (0, 0))
+        if not self.path.exists():
+            logging.warning(f"Coin index snapshot {self.path} not found; starting empty")
+            self._map = b""
+            return
+        with open(self.path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            self._loaded = (stat.st_mtime_ns, stat.st_ino)
+            # Swapping the reference is atomic; readers keep the old map until done
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if stat.st_size else b""
+
+    def get(self, symbol: str) -> Optional[str]:
+        # Exact symbol lookup; the best ranked coin wins on collisions
+        key = symbol.upper().encode()
+        data = self._data
+        # Binary search over line starts in the sorted snapshot
+        lo, hi = 0, len(data)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = data.rfind(b"\n", 0, mid) + 1
+            end = data.find(b"\n", start)
+            end = len(data) if end == -1 else end
+            if data[start:data.find(b"\t", start, end)] < key:
+                lo = end + 1
+            else:
+                hi = start
+        if lo >= len(data):
+            return None
+        end = data.find(b"\n", lo)
+        fields = data[lo:len(data) if end == -1 else end].split(b"\t")
+        return fields[1].decode() if fields[0] == key else None
+
+    def resolve(self, query: str) -> Optional[str]:
+        # Symbol, id, name, prefix and typo-tolerant lookup once the
+        # resolver is built; exact symbol lookup until then
+        resolver = self.resolver
+        if resolver:
+            return resolver.resolve(query)
+        return self.get(query)
+
+    def build_resolver(self) -> None:
+        self.resolver = CoinResolver(read_rows(self._data[:]))
+
+    def to_dict(self) -> Dict[str, str]:
+        mapping = {}
+        for symbol, coin_id, _, _ in read_rows(self._data[:]):
+            mapping.setdefault(symbol, coin_id)
+        return mapping
+
+    def refresh(self, ranked_pages: int = 4, timeout: float = 30) -> int:
+        coins = self.http.get(COIN_LIST_URL, timeout=timeout).json()
+
+        # Market cap ranks of the top coins, used to disambiguate shared tickers
+        ranks = {}
+        for page in range(1, ranked_pages + 1):
+            response = self.http.get(
+                COIN_MARKETS_URL,
+                params={"vs_currency": "usd", "order": "market_cap_desc", "per_page": 250, "page": page},
+                timeout=timeout,
+            )
+            ranks.update({
+                coin["id"]: coin["market_cap_rank"] if isinstance(coin.get("market_cap_rank"), int) else None
+                for coin in response.json()
+                if isinstance(coin, dict) and isinstance(coin.get("id"), str)
+            })
+
+        # Malformed rows are skipped rather than failing the whole refresh
+        entries = [
+            (coin["symbol"], coin["id"], str(coin.get("name") or coin["id"]), ranks.get(coin["id"]))
+            for coin in coins
+            if isinstance(coin, dict) and isinstance(coin.get("id"), str) and isinstance(coin.get("symbol"), str)
+        ]
+        if not entries:
+            raise ValueError("The coin list has no usable rows")
+        write_snapshot(self.path, entries)
+        self.load()
+        self.build_resolver()
+        return len(entries)
+
+    def reload_if_changed(self) -> bool:
+        # Pick up a snapshot refreshed by another worker
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return False
+        if (stat.st_mtime_ns, stat.st_ino) == self._loaded:
+            return False
+        self.load()
+        self.build_resolver()
+        return True
+
+    def age(self) -> float:
+        # Seconds since the snapshot was last written
+        if not self.path.exists():
+            return float("inf")
+        return max(0.0, time.time() - self.path.stat().st_mtime)
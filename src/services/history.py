@@ -0,0 +1,259 @@
+import functools
+import logging
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+try:
+    import tiktoken
+except ImportError:  # Fall back to a character-based estimate (~4 chars per token)
+    tiktoken = None
+
+
+# Rough per-message overhead the chat format adds on top of the content
+MESSAGE_OVERHEAD_TOKENS = 4
+
+SUMMARY_PREFIX = "Summary of earlier conversation:\n"
+
+
+class Fitted(NamedTuple):
+    # Trimmed view of a History's first `end` messages for one budget
+    budget: int
+    end: int
+    messages: List[dict]
+    counts: List[int]
+    tokens: int
+
+
+class History:
+    """
+    Append-only message history for one Swarm.run call.
+
+    The caller's messages are shared instead of deep-copied. Messages are
+    never mutated in place: trimming builds new dicts (copy-on-write), and
+    messages produced during the run go to `tail`. Token counts are cached
+    per position, so each turn only counts what was appended since. The
+    last trimmed view is kept in `fitted`, so later turns extend it
+    instead of trimming the whole history again.
+    """
+
+    def __init__(self, messages: List[dict]):
+        self.base = messages
+        self.tail = []
+        self.token_counts = []
+        self.token_total = 0
+        self.fitted: Optional[Fitted] = None
+
+    def __len__(self) -> int:
+        return len(self.base) + len(self.tail)
+
+    def __iter__(self) -> Iterator[dict]:
+        yield from self.base
+        yield from self.tail
+
+    def append(self, message: dict) -> None:
+        self.tail.append(message)
+
+    def extend(self, messages: List[dict]) -> None:
+        self.tail.extend(messages)
+
+    def since(self, position: int) -> List[dict]:
+        # Messages from `position` on, without copying the rest
+        base_len = len(self.base)
+        return self.base[position:] + self.tail[max(position - base_len, 0):]
+
+    def count_tokens(self, count_message) -> int:
+        # Count only the messages that arrived since the last call
+        for message in self.since(len(self.token_counts)):
+            tokens = count_message(message)
+            self.token_counts.append(tokens)
+            self.token_total += tokens
+        return self.token_total
+
+
+class Prompt:
+    # Re-iterable view of [system] + history, so no list is rebuilt per turn
+
+    def __init__(self, system: dict, messages):
+        self.system = system
+        self.messages = messages
+
+    def __len__(self) -> int:
+        return len(self.messages) + 1
+
+    def __iter__(self) -> Iterator[dict]:
+        yield self.system
+        yield from self.messages
+
+
+class HistoryManager:
+    """
+    Keeps the history sent to the model within a token budget.
+
+    Over budget, it first shortens tool outputs, older ones before recent
+    ones, then drops the oldest turns and replaces them with a short
+    extractive summary, leaving `headroom` of the budget free. The most
+    recent `keep_recent` messages are always kept. The system prompt
+    is added by the caller and counted against the budget. `compact()`
+    applies the same trimming to a history that is stored between runs.
+    """
+
+    def __init__(
+        self,
+        default_budget: Optional[int] = None,
+        keep_recent: int = 6,
+        max_tool_chars: int = 2000,
+        max_summary_chars: int = 1500,
+        headroom: float = 0.1,
+        encoding: str = "cl100k_base",
+    ):
+        self.default_budget = default_budget
+        self.keep_recent = keep_recent
+        self.max_tool_chars = max_tool_chars
+        self.max_summary_chars = max_summary_chars
+        # Share of the budget left free when old turns are dropped, so the
+        # next turns fit without trimming again
+        self.headroom = headroom
+        self.encoding = encoding
+        # Strings cache their hash, so repeated lookups of the same content are cheap
+        self.count_text = functools.lru_cache(maxsize=65536)(self.count_text)
+
+    @functools.cached_property
+    def encoder(self):
+        # Loaded on the first count, not at import: tiktoken downloads the
+        # encoding the first time it is used on a machine
+        if tiktoken is None:
+            return None
+        try:
+            return tiktoken.get_encoding(self.encoding)
+        except Exception as e:
+            logging.error(f"Error loading tokenizer {self.encoding}, estimating tokens from length: {e}")
+            return None
+
+    def count_text(self, text: str) -> int:
+        if not text:
+            return 0
+        if self.encoder:
+            return len(self.encoder.encode(text, disallowed_special=()))
+        return len(text) // 4 + 1
+
+    def count_message(self, message: dict) -> int:
+        tokens = MESSAGE_OVERHEAD_TOKENS + self.count_text(message.get("content"))
+        for tool_call in message.get("tool_calls") or []:
+            function = tool_call["function"]
+            tokens += self.count_text(function["name"]) + self.count_text(function["arguments"])
+        return tokens
+
+    def count(self, messages: List[dict]) -> int:
+        return sum(self.count_message(message) for message in messages)
+
+    def truncate_tool_message(self, message: dict) -> dict:
+        # Returns a shortened copy; the original message is left untouched
+        content = message.get("content") or ""
+        if message["role"] != "tool" or len(content) <= self.max_tool_chars:
+            return message
+        dropped = len(content) - self.max_tool_chars
+        return {**message, "content": f"{content[:self.max_tool_chars]}... [truncated {dropped} chars]"}
+
+    def summarize(self, messages: List[dict]) -> Optional[dict]:
+        # Extractive summary of dropped turns: what the user asked and what was answered
+        lines = []
+        for message in messages:
+            if message["role"] == "system" and (message.get("content") or "").startswith(SUMMARY_PREFIX):
+                # A summary from an earlier trim; its lines carry over
+                lines.extend(message["content"][len(SUMMARY_PREFIX):].splitlines())
+            elif message["role"] == "user" and message.get("content"):
+                lines.append(f"User asked: {message['content'][:200]}")
+            elif message["role"] == "assistant" and message.get("content"):
+                lines.append(f"{message.get('sender', 'Assistant')} answered: {message['content'][:200]}")
+        if not lines:
+            return None
+        summary = "\n".join(lines)[-self.max_summary_chars:]
+        return {"role": "system", "content": f"{SUMMARY_PREFIX}{summary}"}
+
+    def fit(self, history: History, budget: Optional[int], system: str = ""):
+        """
+        Return the messages of `history` trimmed to fit `budget` tokens
+        together with the system prompt. Returns `history` itself, without
+        copying, when it already fits.
+
+        Once trimmed, later turns append to the previous trimmed view and
+        only trim again when that goes over budget, so a turn costs at
+        most the size of the budget rather than of the whole history.
+        """
+        if not budget:
+            return history
+        budget -= self.count_text(system) + MESSAGE_OVERHEAD_TOKENS
+        if history.count_tokens(self.count_message) <= budget:
+            return history
+
+        fitted = history.fitted
+        if fitted and fitted.budget == budget:
+            new_counts = history.token_counts[fitted.end:]
+            messages = fitted.messages + history.since(fitted.end)
+            counts = fitted.counts + new_counts
+            tokens = fitted.tokens + sum(new_counts)
+            if tokens > budget:
+                messages, counts = self.trim(messages, counts, budget)
+                tokens = sum(counts)
+        else:
+            messages, counts = self.trim(list(history), history.token_counts, budget)
+            tokens = sum(counts)
+        history.fitted = Fitted(budget, len(history), messages, counts, tokens)
+        return messages
+
+    def compact(self, messages: List[dict], budget: Optional[int] = None) -> List[dict]:
+        """
+        Return `messages` trimmed to `budget` tokens (the default budget
+        when not given) for storing between runs. A conversation stored
+        this way stays bounded by the budget, so loading, running and
+        saving each turn costs the same however long it has gone on.
+        """
+        budget = budget or self.default_budget
+        if not budget:
+            return messages
+        counts = [self.count_message(message) for message in messages]
+        if sum(counts) <= budget:
+            return messages
+        return self.trim(messages, counts, budget)[0]
+
+    def trim(self, messages: List[dict], counts: List[int], budget: int) -> Tuple[List[dict], List[int]]:
+        # Trimmed messages and their token counts
+        # Never split an assistant tool call from its tool results
+        split = max(len(messages) - self.keep_recent, 0)
+        while 0 < split < len(messages) and messages[split]["role"] == "tool":
+            split -= 1
+        older, recent = messages[:split], messages[split:]
+        recent_counts = counts[split:]
+
+        # 1. Shorten older tool outputs
+        older = [self.truncate_tool_message(message) for message in older]
+        older_counts = [
+            count if trimmed is original else self.count_message(trimmed)
+            for trimmed, original, count in zip(older, messages, counts)
+        ]
+        recent_tokens = sum(recent_counts)
+        kept_tokens = sum(older_counts)
+        if kept_tokens + recent_tokens <= budget:
+            return older + recent, older_counts + recent_counts
+
+        # 2. The recent window alone is over budget; shorten its tool outputs too
+        if recent_tokens > budget:
+            recent = [self.truncate_tool_message(message) for message in recent]
+            recent_counts = [self.count_message(message) for message in recent]
+            recent_tokens = sum(recent_counts)
+
+        # 3. Drop the oldest turns, keeping a summary of what was dropped
+        target = budget * (1 - self.headroom) - self.max_summary_chars // 4
+        dropped = 0
+        while dropped < len(older) and kept_tokens + recent_tokens > target:
+            kept_tokens -= older_counts[dropped]
+            dropped += 1
+        # Resume at a turn boundary so no tool result loses its tool call
+        while dropped < len(older) and older[dropped]["role"] != "user":
+            dropped += 1
+
+        summary = self.summarize(older[:dropped])
+        head = [summary] if summary else []
+        return (
+            head + older[dropped:] + recent,
+            [self.count_message(message) for message in head] + older_counts[dropped:] + recent_counts,
+        )
@@ -0,0 +1,155 @@
+import time
+import random
+import logging
+import threading
+from typing import Iterable, Optional
+
+import httpx
+
+from src.services.resilience import UpstreamGuard
+
+# Statuses worth retrying; anything else is returned or raised straight away
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def http2_available() -> bool:
+    # httpx only speaks HTTP/2 when the optional h2 package is installed
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class HTTPClient:
+    """
+    Shared outbound HTTP client for the agent tools.
+
+    One keep-alive connection pool for the whole process, so repeated tool
+    calls reuse warm TCP+TLS connections instead of handshaking every
+    time. Every host in `hosts` gets its own pool capped at
+    `max_per_host` connections. HTTP/2 is used when h2 is installed.
+    Transport errors and retryable statuses are retried with full-jitter
+    exponential backoff, and Retry-After is honoured when present. Hosts
+    with an UpstreamGuard are rate limited and circuit broken, and every
+    attempt, retries included, goes through the guard.
+
+    The tools run in Swarm's thread pool, so this wraps the thread-safe
+    synchronous httpx.Client.
+    """
+
+    def __init__(
+        self,
+        hosts: Iterable[str] = (),
+        guards: Iterable[UpstreamGuard] = (),
+        timeout: float = 10,
+        connect_timeout: float = 5,
+        max_connections: int = 100,
+        max_per_host: int = 10,
+        keepalive_expiry: float = 60,
+        retries: int = 2,
+        backoff: float = 0.5,
+        max_backoff: float = 8,
+    ):
+        self.retries = retries
+        self.guards = {guard.name: guard for guard in guards}
+        self.hosts = set(hosts) | set(self.guards)
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.max_connections = max_connections
+        self.max_per_host = max_per_host
+        self.keepalive_expiry = keepalive_expiry
+        self._client: Optional[httpx.Client] = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self) -> httpx.Client:
+        # Built on the first request: loading CA certificates and the
+        # transports is a noticeable part of worker startup
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._build()
+        return self._client
+
+    def _build(self) -> httpx.Client:
+        http2 = http2_available()
+        # One SSL context for every pool instead of loading the CA bundle per host
+        ssl_context = httpx.create_ssl_context()
+        host_limits = httpx.Limits(
+            max_connections=self.max_per_host,
+            max_keepalive_connections=self.max_per_host,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+        return httpx.Client(
+            timeout=self.timeout,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_per_host,
+                keepalive_expiry=self.keepalive_expiry,
+            ),
+            http2=http2,
+            verify=ssl_context,
+            mounts={
+                f"all://{host}": httpx.HTTPTransport(http2=http2, limits=host_limits, verify=ssl_context, retries=0)
+                for host in self.hosts
+            },
+            follow_redirects=True,
+        )
+
+    def request(self, method: str, url: str, retries: Optional[int] = None, **kwargs) -> httpx.Response:
+        """
+        Send a request, retrying transport errors and retryable statuses.
+
+        Raises httpx.HTTPError (HTTPStatusError for non-2xx responses) once
+        the retries are used up, or UpstreamUnavailable when the host's
+        guard refuses the call.
+        """
+        retries = self.retries if retries is None else retries
+        guard = self.guards.get(httpx.URL(url).host)
+        for attempt in range(retries + 1):
+            retry_after = None
+            if guard:
+                # Raises UpstreamUnavailable while the circuit is open or rate limited
+                guard.before_request()
+            try:
+                response = self.client.request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                if guard:
+                    guard.after_response(ok=False)
+                if attempt == retries:
+                    raise
+                logging.warning(f"{method} {url} failed: {e!r}, retrying")
+            except BaseException:
+                if guard:
+                    guard.cancel()
+                raise
+            else:
+                retryable = response.status_code in RETRY_STATUSES
+                if retryable:
+                    retry_after = response.headers.get("Retry-After")
+                if guard:
+                    hold = float(retry_after) if response.status_code == 429 and retry_after and retry_after.isdigit() else None
+                    guard.after_response(ok=not retryable, retry_after=hold)
+                if not retryable or attempt == retries:
+                    response.raise_for_status()
+                    return response
+                logging.warning(f"{method} {url} returned {response.status_code}, retrying")
+            time.sleep(self.delay(attempt, retry_after))
+
+    def get(self, url: str, **kwargs) -> httpx.Response:
+        return self.request("GET", url, **kwargs)
+
+    def delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        # Full jitter keeps concurrent retries from hitting the upstream in lockstep
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.max_backoff)
+        return random.uniform(0, min(self.backoff * 2**attempt, self.max_backoff))
+
+    def stats(self) -> dict:
+        return {host: guard.stats() for host, guard in self.guards.items()}
+
+    def close(self) -> None:
+        if self._client is not None:
+            self._client.close()
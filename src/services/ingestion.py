@@ -0,0 +1,299 @@
+import json
+import time
+import random
+import asyncio
+import hashlib
+import logging
+from pathlib import Path
+from typing import List, Optional
+
+from src.services.storage import atomic_write
+
+
+def status_of(knowledge_base: dict) -> Optional[str]:
+    # The status may be top level or under "data"
+    for payload in (knowledge_base, knowledge_base.get("data")):
+        if isinstance(payload, dict) and payload.get("status"):
+            return str(payload["status"]).lower()
+    return None
+
+
+def document_ids_of(knowledge_base: dict) -> List[str]:
+    # Ids of the documents listed in a knowledge base, top level or under "data"
+    for payload in (knowledge_base, knowledge_base.get("data")):
+        if not isinstance(payload, dict):
+            continue
+        for key in ("files", "documents", "knowledgeBaseFiles"):
+            if isinstance(payload.get(key), list):
+                return [
+                    str(document.get("fileKey") or document.get("id"))
+                    for document in payload[key]
+                    if isinstance(document, dict) and (document.get("fileKey") or document.get("id"))
+                ]
+    return []
+
+
+def document_id_of(response: dict, name: str) -> Optional[str]:
+    # The file key of the document an add-file response describes, which is
+    # what removing it expects: given directly, or listed under its file name
+    for payload in (response, response.get("data")):
+        if isinstance(payload, dict) and payload.get("fileKey"):
+            return str(payload["fileKey"])
+    for payload in (response, response.get("data")):
+        if not isinstance(payload, dict):
+            continue
+        for key in ("files", "documents", "knowledgeBaseFiles"):
+            for document in payload.get(key) or []:
+                if isinstance(document, dict) and document.get("fileKey") and name in (
+                    document.get("name"), document.get("fileName")
+                ):
+                    return str(document["fileKey"])
+    return None
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class IngestionLedger:
+    """
+    Content-addressed record of what has been sent to Rivalz, persisted as
+    JSON so restarts skip work that is already done. Documents are keyed
+    by the SHA-256 of their content and hold the file name, upload result,
+    knowledge base id and document id. File hashes are cached by size and
+    mtime, so an unchanged tree is checked without reading any file.
+    Every update is written atomically.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.data = {"knowledge_base_id": None, "ready": False, "files": {}, "documents": {}}
+        if self.path.exists():
+            try:
+                with open(self.path) as f:
+                    self.data.update(json.load(f))
+            except ValueError:
+                logging.warning(f"Ignoring unreadable ingestion ledger {self.path}")
+
+    @property
+    def knowledge_base_id(self) -> Optional[str]:
+        return self.data.get("knowledge_base_id")
+
+    @knowledge_base_id.setter
+    def knowledge_base_id(self, value: Optional[str]) -> None:
+        self.data["knowledge_base_id"] = value
+        self.data["ready"] = False
+        self.save()
+
+    @property
+    def ready(self) -> bool:
+        return bool(self.data.get("ready"))
+
+    @ready.setter
+    def ready(self, value: bool) -> None:
+        self.data["ready"] = value
+        self.save()
+
+    def sha256(self, path: Path) -> str:
+        stat = Path(path).stat()
+        version = [stat.st_size, stat.st_mtime_ns]
+        cached = self.data["files"].get(Path(path).name)
+        if cached and cached["version"] == version:
+            return cached["sha256"]
+        digest = file_sha256(path)
+        self.data["files"][Path(path).name] = {"version": version, "sha256": digest}
+        return digest
+
+    def document(self, path: Path) -> dict:
+        entry = self.data["documents"].setdefault(self.sha256(path), {})
+        entry["name"] = Path(path).name
+        return entry
+
+    def update(self, path: Path, **fields) -> None:
+        self.document(path).update(fields)
+        self.save()
+
+    def forget(self, digest: str) -> None:
+        self.data["documents"].pop(digest, None)
+        self.save()
+
+    def added(self) -> dict:
+        # Documents in the current knowledge base, by content hash
+        knowledge_base_id = self.knowledge_base_id
+        return {
+            digest: entry
+            for digest, entry in self.data["documents"].items()
+            if knowledge_base_id and entry.get("knowledge_base_id") == knowledge_base_id
+        }
+
+    def document_ids(self) -> List[str]:
+        return [entry["document_id"] for entry in self.added().values() if entry.get("document_id")]
+
+    def save(self) -> None:
+        atomic_write(self.path, json.dumps(self.data, indent=2).encode())
+
+
+class Ingestor:
+    """
+    Uploads documents and adds them to a Rivalz knowledge base using a
+    bounded pool of concurrent SDK calls, recording each finished step in
+    the ledger. Files with identical content are sent once, and content
+    already uploaded or already in the knowledge base is skipped, so a
+    restart with unchanged files makes no SDK calls and reuses the
+    existing knowledge base. Documents whose file changed or disappeared
+    are removed from the knowledge base, which is rebuilt when one of
+    them has no known document id. A failed document is logged and left
+    unrecorded, to be retried by the next run.
+    """
+
+    def __init__(self, client, ledger: IngestionLedger, workers: int = 4, name: str = "Multi-Agent RAG Knowledge Base"):
+        self.client = client
+        self.ledger = ledger
+        self.name = name
+        self.semaphore = asyncio.Semaphore(workers)
+        self.changed = False
+
+    async def _call(self, func, *args):
+        async with self.semaphore:
+            return await asyncio.to_thread(func, *args)
+
+    async def upload(self, path: Path, upload=None) -> None:
+        # `upload` defaults to client.upload_file; other file types pass their own
+        if self.ledger.document(path).get("upload"):
+            return
+        try:
+            result = await self._call(upload or self.client.upload_file, path)
+        except Exception as e:
+            logging.error(f"Upload of {path.name} failed: {e}")
+            return
+        self.ledger.update(path, upload=result)
+        logging.info(f"Uploaded {path.name}")
+
+    async def _add(self, path: Path, knowledge_base_id: str) -> None:
+        if self.ledger.document(path).get("knowledge_base_id") == knowledge_base_id:
+            return
+        try:
+            document = await self._call(self.client.add_document_to_knowledge_base, path, knowledge_base_id)
+        except Exception as e:
+            logging.error(f"Adding {path.name} to the knowledge base failed: {e}")
+            return
+        self.changed = True
+        document_id = document_id_of(document, path.name)
+        if not document_id:
+            logging.error(f"No document id for {path.name}; the knowledge base will be rebuilt if it changes")
+        self.ledger.update(path, knowledge_base_id=knowledge_base_id, document_id=document_id)
+        logging.info(f"Added {path.name} to the knowledge base")
+
+    async def _remove(self, digest: str, entry: dict, knowledge_base_id: str) -> None:
+        self.changed = True
+        if entry.get("document_id"):
+            try:
+                await self._call(
+                    self.client.delete_document_from_knowledge_base, entry["document_id"], knowledge_base_id
+                )
+            except Exception as e:
+                logging.error(f"Removing the old version of {entry.get('name')} failed: {e}")
+                return
+        self.ledger.forget(digest)
+        logging.info(f"Removed the old version of {entry.get('name')} from the knowledge base")
+
+    async def _seed_id(self, knowledge_base: dict) -> Optional[str]:
+        # The id of the document a knowledge base was created from, from
+        # the create response or else by listing the knowledge base
+        document_ids = document_ids_of(knowledge_base)
+        if not document_ids:
+            try:
+                document_ids = document_ids_of(await self._call(self.client.get_knowledge_base, knowledge_base["id"]))
+            except Exception as e:
+                logging.warning(f"Listing knowledge base {knowledge_base['id']} failed: {e}")
+        if not document_ids:
+            logging.error(
+                f"No document id for the first document of knowledge base {knowledge_base['id']}; "
+                "the knowledge base will be rebuilt if that document changes"
+            )
+            return None
+        return document_ids[0]
+
+    async def run(self, paths: List[Path]) -> Optional[str]:
+        """
+        Ingest the documents and return the knowledge base id, or None if
+        no knowledge base could be created.
+        """
+        # Files with identical content are ingested once
+        by_digest = {}
+        for path, digest in await asyncio.to_thread(lambda: [(Path(p), self.ledger.sha256(p)) for p in paths]):
+            if digest in by_digest:
+                logging.info(f"Skipping {path.name}: same content as {by_digest[digest].name}")
+                continue
+            by_digest[digest] = path
+        paths, digests = list(by_digest.values()), set(by_digest)
+        self.ledger.save()
+        uploads = asyncio.gather(*(self.upload(path) for path in paths))
+
+        try:
+            knowledge_base_id = self.ledger.knowledge_base_id
+            stale = {digest: entry for digest, entry in self.ledger.added().items() if digest not in digests}
+            if any(not entry.get("document_id") for entry in stale.values()):
+                # The old version cannot be deleted without its id, so it
+                # would keep answering: build a new knowledge base instead
+                logging.error(
+                    f"Knowledge base {knowledge_base_id} holds a changed document with no recorded id, rebuilding it"
+                )
+                knowledge_base_id = None
+
+            if not knowledge_base_id and paths:
+                # A knowledge base is created from its first document
+                first = paths[0]
+                knowledge_base = await self._call(self.client.create_rag_knowledge_base, first, self.name)
+                knowledge_base_id = knowledge_base["id"]
+                self.changed = True
+                self.ledger.knowledge_base_id = knowledge_base_id
+                document_id = await self._seed_id(knowledge_base)
+                self.ledger.update(first, knowledge_base_id=knowledge_base_id, document_id=document_id)
+                logging.info(f"Created knowledge base {knowledge_base_id}")
+
+            if knowledge_base_id:
+                stale = {digest: entry for digest, entry in self.ledger.added().items() if digest not in digests}
+                await asyncio.gather(
+                    *(self._add(path, knowledge_base_id) for path in paths),
+                    *(self._remove(digest, entry, knowledge_base_id) for digest, entry in stale.items()),
+                )
+        finally:
+            await uploads
+        if self.changed and self.ledger.ready:
+            self.ledger.ready = False
+        return knowledge_base_id
+
+    async def wait_until_ready(
+        self,
+        knowledge_base_id: str,
+        timeout: float = 60,
+        initial_delay: float = 0.5,
+        max_delay: float = 8,
+    ) -> bool:
+        # Skipped when the knowledge base was ready and nothing changed since
+        if self.ledger.ready and self.ledger.knowledge_base_id == knowledge_base_id:
+            return True
+        # Poll this knowledge base with jittered exponential backoff
+        deadline = time.monotonic() + timeout
+        delay = initial_delay
+        while True:
+            try:
+                status = status_of(await self._call(self.client.get_knowledge_base, knowledge_base_id))
+            except Exception as e:
+                logging.warning(f"Knowledge base status check failed: {e}")
+                status = None
+            if status == "ready":
+                self.ledger.ready = True
+                return True
+            if status in ("failed", "error"):
+                return False
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            await asyncio.sleep(min(random.uniform(delay / 2, delay), remaining))
+            delay = min(delay * 2, max_delay)
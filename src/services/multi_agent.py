@@ -1,93 +1,239 @@
 from dotenv import load_dotenv
 import logging
 import asyncio
-import requests
-import json
+import httpx
 import time
+import threading
+import itertools
+import weakref
 from pathlib import Path
-from src.rivalz_client_sdk import RivalzClientSdk
-import os
+from src.config import Config
+from typing import TYPE_CHECKING, List
 _ = load_dotenv()
 
 from src.services.agent import Agent, Swarm
-from langchain_community.tools import DuckDuckGoSearchResults
+from src.services.sessions import CURRENT_SESSION_ID, Session, create_session_store
+from src.services.history import HistoryManager
+from src.services.tracing import create_tracer
+from src.services.cache import TTLCache
+from src.services.batching import MicroBatcher
+from src.services.coin_index import CoinIndex
+from src.services.http import HTTPClient
+from src.services.resilience import UpstreamGuard, UpstreamUnavailable
+from src.services.search import CachedSearch, create_search_backend
+from src.services.retrieval import DOCUMENT_SUFFIXES, LocalRetriever, RivalzRetriever
+from src.services.semantic_cache import SemanticCache
+from src.services.ingestion import IngestionLedger, Ingestor
+from src.services.shared_state import LeaderLock, SharedState
+from src.services.tvl_store import TVLStore
+from src.services import tvl_analytics
+from src.services.tvl_analytics import TVLSeries
+
+if TYPE_CHECKING:
+    from src.rivalz_client_sdk import RivalzClientSdk
 
 
 # Initialize Swarm with telemetry (for Rivalz AI Network)
-client = Swarm()
+client = Swarm(
+    max_connections=Config.OPENAI_MAX_CONNECTIONS,
+    max_keepalive_connections=Config.OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+    keepalive_expiry=Config.OPENAI_KEEPALIVE_EXPIRY,
+    request_timeout=Config.OPENAI_REQUEST_TIMEOUT,
+    max_concurrent_completions=Config.OPENAI_MAX_CONCURRENT_COMPLETIONS,
+    history_manager=HistoryManager(
+        default_budget=Config.CONTEXT_BUDGET_TOKENS,
+        keep_recent=Config.HISTORY_KEEP_RECENT,
+        max_tool_chars=Config.HISTORY_MAX_TOOL_CHARS,
+    ),
+    tracer=create_tracer(Config.TRACE_SAMPLE_RATE),
+)
+
+# Conversation history and active agent, keyed by session id
+session_store = create_session_store(
+    Config.SESSION_BACKEND,
+    Config.SESSION_TTL_SECONDS,
+    Config.SESSION_DB_PATH,
+)
+
+# Pooled keep-alive connections shared by every outbound tool call
+HTTP = HTTPClient(
+    guards=[
+        UpstreamGuard(
+            host,
+            rate_per_minute=rate,
+            burst=Config.UPSTREAM_BURST,
+            max_wait=Config.UPSTREAM_MAX_WAIT,
+            failure_threshold=Config.CIRCUIT_FAILURE_THRESHOLD,
+            reset_timeout=Config.CIRCUIT_RESET_SECONDS,
+        )
+        for host, rate in (
+            ("api.coingecko.com", Config.COINGECKO_RATE_PER_MINUTE),
+            ("api.llama.fi", Config.DEFILLAMA_RATE_PER_MINUTE),
+        )
+    ],
+    timeout=Config.HTTP_TIMEOUT,
+    connect_timeout=Config.HTTP_CONNECT_TIMEOUT,
+    max_connections=Config.HTTP_MAX_CONNECTIONS,
+    max_per_host=Config.HTTP_MAX_CONNECTIONS_PER_HOST,
+    retries=Config.HTTP_RETRIES,
+)
 
-# Initialize Rivalz Client for RAG operations
+# Rivalz client for RAG operations, created once on first use and shared
 CURRENT_DIR = Path(__file__).parent
-rivalz_client = RivalzClientSdk(os.getenv("RIVALZ_SECRET_TOKEN"))
+RIVALZ_CLIENT = None
+RIVALZ_CLIENT_LOCK = threading.Lock()
+
+def get_rivalz_client() -> "RivalzClientSdk":
+    global RIVALZ_CLIENT
+    if RIVALZ_CLIENT is None:
+        with RIVALZ_CLIENT_LOCK:
+            if RIVALZ_CLIENT is None:
+                # The SDK is only imported when RAG actually talks to Rivalz
+                from src.rivalz_client_sdk import RivalzClientSdk
+
+                RIVALZ_CLIENT = RivalzClientSdk(Config.RIVALZ_SECRET_TOKEN, timeout=Config.RIVALZ_TIMEOUT)
+    return RIVALZ_CLIENT
 
 # Global variables to store RAG context
 KNOWLEDGE_BASE_ID = None
 RAG_DOCUMENTS = []
 
-async def setup_rag_pipeline():
+# Where query_rag_knowledge_base gets its context from
+if Config.RAG_BACKEND == "local":
+    RETRIEVER = LocalRetriever(Config.RAG_INDEX_DIR)
+elif Config.RAG_BACKEND == "rivalz":
+    RETRIEVER = RivalzRetriever(
+        get_client=get_rivalz_client,
+        get_knowledge_base_id=lambda: KNOWLEDGE_BASE_ID,
+        get_conversation_id=CURRENT_SESSION_ID.get,
+        get_document_ids=lambda: RAG_DOCUMENTS,
+        # Published by the leader once the knowledge base finished indexing
+        get_ready=lambda: RAG_PIPELINE["status"] == "ready",
+        session_ttl=Config.SESSION_TTL_SECONDS,
+    )
+else:
+    raise ValueError(f"Unknown RAG backend: {Config.RAG_BACKEND}")
+
+# Answers for paraphrased questions, dropped whenever the documents change
+RAG_ANSWER_CACHE = SemanticCache(
+    threshold=Config.RAG_ANSWER_CACHE_THRESHOLD,
+    maxsize=Config.RAG_ANSWER_CACHE_SIZE,
+    ttl=Config.RAG_ANSWER_CACHE_TTL,
+)
+
+# Progress of the background RAG warmup, reported by /health/ready
+RAG_PIPELINE = {"status": "pending", "detail": None, "attempts": 0, "ready_at": None, "role": None}
+
+# One worker per host leads: it ingests documents and refreshes the coin
+# index and TVL snapshots, and publishes the results for the others
+LEADER = LeaderLock(Config.LEADER_LOCK_PATH)
+SHARED_STATE = SharedState(Config.SHARED_STATE_PATH)
+
+async def setup_rag_pipeline() -> bool:
+    # Returns whether the knowledge base is ready; errors propagate to the caller
     global KNOWLEDGE_BASE_ID, RAG_DOCUMENTS
+
+    if Config.RAG_BACKEND == "local":
+        # Index the documents locally (skipped when unchanged); nothing is uploaded
+        documents = sorted(
+            path for path in Config.RAG_DOCUMENTS_DIR.glob("*") if path.suffix.lower() in DOCUMENT_SUFFIXES
+        )
+        count = await asyncio.to_thread(RETRIEVER.build, documents)
+        print(f"✅ Local RAG index ready with {count} passages")
+        return True
     
     # Initialize the client
     print("🚀 Initializing Rivalz client...")
-    client = RivalzClientSdk(os.getenv("RIVALZ_SECRET_TOKEN"))
-
-    try:
-        # Upload files
-        print("📁 Uploading files...")
-        upload_results = []
-
-        # Dynamically find and upload PDF files from a documents directory
-        documents_dir = CURRENT_DIR / "../documents"
-        pdf_files = []
-        if documents_dir.exists():
-            pdf_files = list(documents_dir.glob("*.pdf"))
-            for pdf_file in pdf_files:
-                upload_result = await asyncio.to_thread(client.upload_file, pdf_file)
-                upload_results.append(upload_result)
-                print(f"✅ File uploaded successfully: {pdf_file.name}")
-        
-        # Upload other file types if needed (e.g., passport)
-        passport_path = documents_dir / "passport.jpg"
-        if passport_path.exists():
-            passport_result = await asyncio.to_thread(client.upload_passport, passport_path)
-            print("✅ Passport uploaded successfully")
-
-        # Create knowledge base (use the first PDF found)
-        if pdf_files:
-            print("\n📚 Creating knowledge base...")
-            knowledge_base = await asyncio.to_thread(
-                client.create_rag_knowledge_base, pdf_files[0], "Multi-Agent RAG Knowledge Base"
-            )
-            KNOWLEDGE_BASE_ID = knowledge_base["id"]
-            print("✅ Knowledge base created:", KNOWLEDGE_BASE_ID)
-
-            # Add additional documents to knowledge base
-            for doc in pdf_files[1:]:
-                document = await asyncio.to_thread(
-                    client.add_document_to_knowledge_base, doc, KNOWLEDGE_BASE_ID
-                )
-                RAG_DOCUMENTS.append(document["id"])
-                print(f"✅ Document added: {document['id']}")
-
-            # Wait for knowledge base to be ready with a timeout
-            timeout_duration = 60  # 1 minute timeout
-            start_time = time.time()
-
-            while True:
-                response = await asyncio.to_thread(client.get_knowledge_bases)
-                if response[0]["status"] == "ready":
-                    break
-                if time.time() - start_time > timeout_duration:
-                    print("⚠️ Timeout reached: Knowledge base not ready after 60 seconds. Proceeding...")
-                    break
-                await asyncio.sleep(1)
-
-            print("✅ RAG Pipeline Setup Complete (with or without timeout)")
-            return KNOWLEDGE_BASE_ID
-
-    except Exception as error:
-        print("❌ RAG Setup Error:", str(error))
-        return None
+    client = get_rivalz_client()
+
+    # Dynamically find the PDF files in the documents directory
+    documents_dir = Config.RAG_DOCUMENTS_DIR
+    pdf_files = sorted(documents_dir.glob("*.pdf")) if documents_dir.exists() else []
+
+    # Files already sent are recognised by content hash and skipped, and
+    # the existing knowledge base is reused
+    ingestor = Ingestor(
+        client,
+        IngestionLedger(Config.RAG_LEDGER_PATH),
+        workers=Config.RAG_INGEST_WORKERS,
+    )
+
+    # Upload other file types if needed (e.g., passport)
+    passport_path = documents_dir / "passport.jpg"
+    if passport_path.exists():
+        await ingestor.upload(passport_path, client.upload_passport)
+
+    if not pdf_files:
+        raise FileNotFoundError(f"No PDF documents found in {documents_dir}")
+
+    print(f"📚 Ingesting {len(pdf_files)} documents...")
+    KNOWLEDGE_BASE_ID = await ingestor.run(pdf_files)
+    RAG_DOCUMENTS[:] = ingestor.ledger.document_ids()
+    print("✅ Knowledge base:", KNOWLEDGE_BASE_ID)
+    if not KNOWLEDGE_BASE_ID:
+        return False
+
+    ready = await ingestor.wait_until_ready(KNOWLEDGE_BASE_ID, timeout=Config.RAG_READY_TIMEOUT)
+    if not ready:
+        print(f"⚠️ Knowledge base not ready after {Config.RAG_READY_TIMEOUT:.0f} seconds")
+    return ready
+
+
+def publish_rag_pipeline() -> None:
+    SHARED_STATE.set("rag", {
+        "pipeline": {key: value for key, value in RAG_PIPELINE.items() if key != "role"},
+        "knowledge_base_id": KNOWLEDGE_BASE_ID,
+        "documents": list(RAG_DOCUMENTS),
+        "version": RETRIEVER.version(),
+    })
+
+
+def follow_rag_pipeline() -> None:
+    # Adopt the knowledge base and pipeline state published by the leader
+    global KNOWLEDGE_BASE_ID
+    state = SHARED_STATE.get("rag")
+    if not state:
+        return
+    KNOWLEDGE_BASE_ID = state["knowledge_base_id"]
+    RAG_DOCUMENTS[:] = state["documents"]
+    RAG_PIPELINE.update(state["pipeline"], role="follower")
+    if Config.RAG_BACKEND == "local" and state["version"] != RETRIEVER.version():
+        # The leader rebuilt the shared on-disk index
+        RETRIEVER.load()
+
+
+async def warm_up_rag_pipeline(retry_delay: float = 5, max_retry_delay: float = 300):
+    # Runs in the background so the app serves traffic while RAG is set up.
+    # The leader ingests, retrying failed or unfinished setups with
+    # exponential backoff; followers mirror what it publishes and take
+    # over if it exits
+    delay = retry_delay
+    while True:
+        if not await asyncio.to_thread(LEADER.acquire):
+            await asyncio.to_thread(follow_rag_pipeline)
+            await asyncio.sleep(Config.SHARED_STATE_SYNC_SECONDS)
+            continue
+
+        RAG_PIPELINE["attempts"] += 1
+        RAG_PIPELINE["status"] = "starting" if RAG_PIPELINE["attempts"] == 1 else "retrying"
+        RAG_PIPELINE["role"] = "leader"
+        await asyncio.to_thread(publish_rag_pipeline)
+        try:
+            ready = await setup_rag_pipeline()
+        except Exception as error:
+            print("❌ RAG Setup Error:", str(error))
+            RAG_PIPELINE["detail"] = str(error)
+        else:
+            if ready:
+                RAG_PIPELINE.update(status="ready", detail=None, ready_at=time.time())
+                await asyncio.to_thread(publish_rag_pipeline)
+                print("✅ RAG Pipeline Setup Complete")
+                return
+            RAG_PIPELINE["detail"] = "knowledge base not ready yet"
+        RAG_PIPELINE["status"] = "waiting"
+        await asyncio.to_thread(publish_rag_pipeline)
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, max_retry_delay)
  
 
 def create_rag_knowledge_base(document_path, knowledge_base_name):
@@ -102,7 +248,7 @@ def create_rag_knowledge_base(document_path, knowledge_base_name):
         dict: Knowledge base creation result
     """
     try:
-        knowledge_base = rivalz_client.create_rag_knowledge_base(
+        knowledge_base = get_rivalz_client().create_rag_knowledge_base(
             document_path, 
             knowledge_base_name
         )
@@ -128,27 +274,41 @@ def query_rag_knowledge_base(query):
     Returns:
         dict: Contextual response from the knowledge base
     """
-    if not KNOWLEDGE_BASE_ID:
-        return {"error": "Knowledge base not initialized"}
-    
-    try:
-        client = RivalzClientSdk(os.getenv("RIVALZ_SECRET_TOKEN"))
-        chat_response = client.create_chat_session(
-            KNOWLEDGE_BASE_ID, 
-            query
-        )
+    if not RETRIEVER.ready():
+        # Answer at once instead of waiting for the background warmup
         return {
-            "status": "success",
-            "response": chat_response.get("response", "No response"),
-            "context": chat_response.get("context", [])
+            "status": "unavailable",
+            "message": "The knowledge base is still being prepared. Answer from general knowledge "
+            "and mention that the documents could not be consulted yet.",
+            "pipeline": RAG_PIPELINE["status"],
         }
+    
+    version = RETRIEVER.version()
+    # Answers from a conversation's chat session are only reused within it
+    scope = RETRIEVER.cache_scope()
+    cached = RAG_ANSWER_CACHE.get(query, version, scope)
+    if cached is not None:
+        return {**cached, "cached": True}
+
+    try:
+        result = RETRIEVER.query(query, Config.RAG_TOP_K)
+        if result.get("status") == "success":
+            RAG_ANSWER_CACHE.set(query, version, result, scope)
+        return result
     except Exception as e:
         return {
             "status": "error", 
             "message": f"RAG query failed: {str(e)}"
         }
 
-def rivalz_network_info(query: str) -> dict:
+# Cached, non-blocking web search shared by all conversations
+SEARCH = CachedSearch(
+    create_search_backend(Config.SEARCH_BACKEND, Config.SEARCH_FIXTURE_PATH),
+    ttl=Config.SEARCH_CACHE_TTL,
+    timeout=Config.SEARCH_TIMEOUT,
+)
+
+async def rivalz_network_info(query: str) -> dict:
     """
     Perform a search to retrieve information about Rivalz AI and return structured, relevant results.
 
@@ -158,83 +318,152 @@ def rivalz_network_info(query: str) -> dict:
     Returns:
     - dict: A dictionary containing relevant search results or an error message.
     """
-    try:
-        # Initialize DuckDuckGo Search Results tool
-        search_tool = DuckDuckGoSearchResults()
-        
-        # Add specific context for Rivalz AI to the query
-        full_query = f"Rivalz AI {query}"
-        
-        # Perform the search and retrieve the results
-        raw_results = search_tool.run(full_query)
-        
-        # Ensure results are valid JSON if applicable
-        try:
-            results = json.loads(raw_results) if isinstance(raw_results, str) else raw_results
-        except json.JSONDecodeError:
-            return {
-                "error": "Invalid Response Format",
-                "message": "Could not parse search results into JSON.",
-                "raw_results": raw_results,
-            }
-
-        # Validate that results is iterable and contains dictionaries
-        if not isinstance(results, list):
-            return {
-                "error": "Unexpected Response Structure",
-                "message": "Results are not in the expected list format.",
-                "raw_results": results,
-            }
-
-        # Filter and structure the output for clarity
-        relevant_results = []
-        for result in results:
-            if isinstance(result, dict):  # Ensure each result is a dictionary
-                title = result.get("title", "No Title")
-                url = result.get("link", "No URL")
-                snippet = result.get("snippet", "No Snippet")
-                
-                if "Rivalz AI" in title or "Rivalz AI" in snippet:
-                    relevant_results.append({"title": title, "url": url, "snippet": snippet})
-        
-        # If no relevant results, return a fallback message
-        if not relevant_results:
-            return {"message": f"No relevant results found for Rivalz AI query: '{query}'."}
-        
-        return {"results": relevant_results[:3]}  # Return up to 5 relevant results
+    # Add specific context for Rivalz AI to the query
+    full_query = f"Rivalz AI {query}"
 
+    try:
+        results = await SEARCH.search(full_query)
+    except asyncio.TimeoutError:
+        return {"error": "Search Timeout", "message": f"Search took longer than {SEARCH.timeout:.0f}s."}
     except Exception as e:
         return {"error": "Search Tool Error", "message": str(e)}
 
+    # Keep results that are actually about Rivalz
+    relevant_results = [
+        result for result in results
+        if "rivalz" in f"{result['title']} {result['snippet']} {result['url']}".lower()
+    ]
+
+    # If no relevant results, return a fallback message
+    if not relevant_results:
+        return {"message": f"No relevant results found for Rivalz AI query: '{query}'."}
+
+    return {"results": relevant_results[:3]}  # Return up to 3 relevant results
+
 
 
-def monitor_tvl_changes(retries: int = 3):
+def fetch_chain_tvls() -> list:
     """
     Fetch the Total Value Locked (TVL) for all chains using DeFiLlama's /v2/chains endpoint.
-    Includes retries for handling failures.
+    Failures are retried with backoff by the shared HTTP client.
+
+    Raises httpx.HTTPError on network errors and ValueError on invalid JSON.
     """
     url = "https://api.llama.fi/v2/chains"  # Endpoint for TVL of all chains
+    return HTTP.get(url).json()
+
+# Snapshots are recorded by poll_tvl_periodically; tools read precomputed deltas
+TVL_STORE = TVLStore(Config.TVL_DB_PATH, retention_hours=Config.TVL_RETENTION_HOURS)
+# Columnar in-memory copy of the same snapshots for the analytics tools
+TVL_SERIES = TVLSeries()
+
+def record_tvl_snapshot(chains: list) -> int:
+    ts = int(time.time())
+    tvls = TVL_STORE.record(chains, ts=ts)
+    TVL_SERIES.append(ts, tvls)
+    return len(tvls)
+
+def sync_tvl_series(since_ts: int) -> int:
+    # Append snapshots recorded by the leader after `since_ts`; returns the latest ts
+    for ts, rows in itertools.groupby(TVL_STORE.history(since_ts + 1), key=lambda row: row[0]):
+        TVL_SERIES.append(ts, {chain: tvl for _, chain, tvl in rows})
+        since_ts = ts
+    return since_ts
+
+def load_tvl_series() -> int:
+    # Downsampled to the series resolution in SQL and streamed into its arrays
+    rows = TVL_STORE.history(time.time() - Config.TVL_ANALYTICS_HOURS * 3600, resolution=TVL_SERIES.resolution)
+    snapshots = TVL_SERIES.load(rows)
+    logging.info(f"Loaded {snapshots} TVL snapshots for analytics")
+    return TVL_SERIES.last_ts or 0
+
+async def poll_tvl_periodically(interval: float = Config.TVL_POLL_SECONDS):
+    # Any failure (network, odd payloads, a locked database) is logged and
+    # retried, so the task lives as long as the process
+    synced = None
+    while True:
+        try:
+            if synced is None:
+                synced = await asyncio.to_thread(load_tvl_series)
+            if not await asyncio.to_thread(LEADER.acquire):
+                # Another worker polls DeFiLlama; read its snapshots from the store
+                synced = await asyncio.to_thread(sync_tvl_series, synced)
+                await asyncio.sleep(Config.SHARED_STATE_SYNC_SECONDS)
+                continue
+            latest = await asyncio.to_thread(TVL_STORE.latest_ts)
+            if latest and time.time() - latest < interval:
+                synced = await asyncio.to_thread(sync_tvl_series, synced)
+                await asyncio.sleep(min(interval - (time.time() - latest), Config.SHARED_STATE_SYNC_SECONDS))
+                continue
+            chains = await asyncio.to_thread(fetch_chain_tvls)
+            count = await asyncio.to_thread(record_tvl_snapshot, chains)
+            synced = await asyncio.to_thread(TVL_STORE.latest_ts)
+            logging.info(f"Recorded TVL snapshot for {count} chains")
+        except (httpx.HTTPError, ValueError) as e:
+            logging.error(f"TVL poll failed: {e}")
+            await asyncio.sleep(min(interval, 300))
+        except Exception:
+            logging.exception("TVL poll failed")
+            await asyncio.sleep(min(interval, 300))
+
+def monitor_tvl_changes(chain: str = None, hours: int = 24, limit: int = 5) -> dict:
+    """
+    Report Total Value Locked (TVL) and its recent changes across blockchains, from DeFiLlama snapshots.
 
-    for attempt in range(retries):
+    Parameters:
+    - chain (str, optional): A chain name (e.g., Ethereum, Solana). When given, returns that chain's TVL and its change over 1h, 24h and 7d.
+    - hours (int, optional): Look-back window for the top movers; the nearest of 1, 24 or 168 hours is used. Defaults to 24.
+    - limit (int, optional): Number of top gainers and losers to return. Defaults to 5.
+
+    Returns:
+    - dict: Either the chain's TVL summary, or the total TVL with the top gainers and losers.
+    """
+    if TVL_STORE.latest_ts() is None:
+        # Nothing polled yet; record one snapshot now so there is something to report
         try:
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()  # Raise error for non-2xx status codes
-            data = response.json()
+            record_tvl_snapshot(fetch_chain_tvls())
+        except (httpx.HTTPError, ValueError) as e:
+            return {"error": f"TVL data unavailable: {e}"}
+
+    if chain:
+        summary = TVL_STORE.chain(chain.strip())
+        return summary or {"error": f"No TVL data for chain '{chain}'"}
+    return TVL_STORE.summary(hours=hours, limit=max(1, min(limit, 20)))
 
-            # Print or process the TVL data for all chains
-            for chain in data:
-                print(f"Chain: {chain['name']}, TVL: {chain['tvl']}")
-            
-            return data  # Return the list of TVLs for further processing if needed
 
-        except requests.RequestException as e:
-            logging.error(f"Attempt {attempt + 1} failed: {e}")
-        except ValueError as ve:
-            logging.error(f"Data error: {ve}")
-            raise
+def analyze_tvl(chain: str = None, hours: int = 24, limit: int = 5) -> dict:
+    """
+    Analyze TVL across blockchains over a time window from stored snapshots.
+
+    Parameters:
+    - chain (str, optional): A chain name (e.g., Ethereum). When given, returns that chain's change, mean, min/max, rank, rank change and dominance.
+    - hours (int, optional): Length of the window in hours, up to a year or more of history. Defaults to 24.
+    - limit (int, optional): Number of chains per list. Defaults to 5.
+
+    Returns:
+    - dict: Total TVL, dominance shares, top gainers and losers and the largest rank shifts, or the single-chain profile.
+    """
+    hours = max(1, hours)
+    if chain:
+        profile = tvl_analytics.chain_profile(TVL_SERIES, chain, hours)
+        return profile or {"error": f"Not enough TVL history for chain '{chain}'"}
+    summary = tvl_analytics.market_structure(TVL_SERIES, hours, max(1, min(limit, 20)))
+    return summary or {"error": "Not enough TVL history yet"}
+
+def detect_tvl_anomalies(lookback_hours: int = 168, threshold: float = 3.0, limit: int = 5) -> dict:
+    """
+    Find chains whose latest TVL move is unusual compared with their own recent history.
 
-    raise RuntimeError("Failed to fetch TVL for all chains after multiple attempts")
+    Parameters:
+    - lookback_hours (int, optional): History used as the baseline, in hours. Defaults to 168 (7 days).
+    - threshold (float, optional): Minimum absolute z-score to report. Defaults to 3.0.
+    - limit (int, optional): Maximum number of chains to return. Defaults to 5.
 
+    Returns:
+    - dict: Chains with their latest percent change and z-score, most unusual first.
+    """
+    result = tvl_analytics.anomalies(TVL_SERIES, max(1, lookback_hours), threshold, max(1, min(limit, 20)))
+    return result or {"error": "Not enough TVL history yet"}
 
 COIN_SYMBOL_TO_ID = {
     "BTC" : "bitcoin",
@@ -261,7 +490,13 @@ COIN_SYMBOL_TO_ID = {
     "SHIB": "shiba-inu",
 }
 
-COIN_LIST_CACHE = {}
+# Loaded from the on-disk snapshot at import; refreshed only in the background
+COIN_INDEX = CoinIndex(
+    Config.COIN_INDEX_PATH,
+    seed_path=Config.COIN_INDEX_SEED_PATH,
+    http=HTTP,
+    pinned=COIN_SYMBOL_TO_ID,
+)
 
 def fetch_coin_list() -> dict:
     """
@@ -270,22 +505,65 @@ def fetch_coin_list() -> dict:
     Returns:
     - dict: A dictionary mapping coin symbols to their CoinGecko IDs.
     """
-    global COIN_LIST_CACHE
+    return COIN_INDEX.to_dict()
+
+async def refresh_coin_index_periodically(interval: float = Config.COIN_INDEX_REFRESH_SECONDS):
+    # Keep the snapshot fresh without ever downloading on the request path;
+    # only the leader downloads, the other workers reload its snapshot
+    await asyncio.to_thread(COIN_INDEX.build_resolver)
+    while True:
+        try:
+            if await asyncio.to_thread(LEADER.acquire) and await asyncio.to_thread(COIN_INDEX.age) >= interval:
+                count = await asyncio.to_thread(COIN_INDEX.refresh, Config.COIN_INDEX_RANKED_PAGES)
+                logging.info(f"Coin index refreshed with {count} symbols")
+            elif await asyncio.to_thread(COIN_INDEX.reload_if_changed):
+                logging.info("Coin index reloaded from the snapshot refreshed by the leader")
+        except (httpx.HTTPError, ValueError) as e:
+            logging.error(f"Coin index refresh failed: {e}")
+            await asyncio.sleep(min(interval, 300))
+        except Exception:
+            # Keep refreshing whatever went wrong, or the index stays frozen
+            logging.exception("Coin index refresh failed")
+            await asyncio.sleep(min(interval, 300))
+        await asyncio.sleep(Config.SHARED_STATE_SYNC_SECONDS)
+
+def fetch_usd_prices(coin_ids: list) -> dict:
+    """
+    Fetch USD prices for several coins in one CoinGecko request.
 
-    if COIN_LIST_CACHE:  # Use cached list if available
-        return COIN_LIST_CACHE
+    Returns a dict of coin id to price; coins without a price are left out.
+    Raises httpx.HTTPError on network errors and ValueError on bad payloads.
+    """
+    url = "https://api.coingecko.com/api/v3/simple/price"
+    params = {"ids": ",".join(coin_ids), "vs_currencies": "usd"}
+    data = HTTP.get(url, params=params).json()
+    if not isinstance(data, dict):
+        raise ValueError("Unexpected price response")
+    return {
+        coin_id: data[coin_id]["usd"]
+        for coin_id in coin_ids
+        if isinstance(data.get(coin_id), dict) and "usd" in data[coin_id]
+    }
+
+# Concurrent single-coin lookups within a short window share one request
+PRICE_BATCHER = MicroBatcher(fetch_usd_prices, window=Config.PRICE_BATCH_WINDOW)
+
+# Shared by all requests: concurrent lookups of one coin make a single upstream call
+PRICE_CACHE = TTLCache(
+    ttl=Config.PRICE_CACHE_TTL,
+    stale_ttl=Config.PRICE_CACHE_STALE_TTL,
+    maxsize=10000,
+)
 
-    url = "https://api.coingecko.com/api/v3/coins/list"
-    try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        coins = response.json()
-        # Map symbols (uppercase) to their IDs
-        COIN_LIST_CACHE = {coin['symbol'].upper(): coin['id'] for coin in coins}
-        return COIN_LIST_CACHE
-    except requests.RequestException as e:
-        print(f"Error fetching coin list: {e}")
-        return {}
+def resolve_coin_id(query: str):
+    # Step 1: Check static mapping first
+    coin_id = COIN_SYMBOL_TO_ID.get(query.upper())
+
+    # Step 2: If not in static mapping, resolve it by symbol, id or name
+    # (including prefixes and typos) through the coin index
+    if not coin_id:
+        coin_id = COIN_INDEX.resolve(query)
+    return coin_id
 
 def crypto_price(query: str) -> dict:
     """
@@ -297,40 +575,81 @@ def crypto_price(query: str) -> dict:
     Returns:
     - dict: A dictionary containing the current price in USD or an error message.
     """
-    url = "https://api.coingecko.com/api/v3/simple/price"
-    # Step 1: Check static mapping first
-    coin_id = COIN_SYMBOL_TO_ID.get(query.upper())
-
-    # Step 2: If not in static mapping, fetch the coin list dynamically
-    if not coin_id:
-        print("Fetching coin list dynamically...")
-        coin_list = fetch_coin_list()
-        coin_id = coin_list.get(query.upper())
+    coin_id = resolve_coin_id(query)
 
     # Step 3: If coin ID is still not found, return an error
     if not coin_id:
         return {"message": f"Unable to find the coin '{query}'. Please check the name or symbol."}
 
-    # Step 4: Query the CoinGecko API for the coin price
-
-    params = {"ids": coin_id, "vs_currencies": "usd"}
-
+    # Step 4: Look up the price through the shared cache. Misses go through
+    # the batcher, which raises KeyError when CoinGecko has no price.
     try:
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-
-         # Check if valid price data exists
-        if coin_id in data and "usd" in data[coin_id]:
-            price = data[coin_id]["usd"]
-            return {"message": f"The current price of {query.upper()} is ${price:.2f} USD."}
-        else:
-            return {"message": f"Unable to retrieve the price for '{query}'."}
-    except requests.RequestException as e:
+        price = PRICE_CACHE.get_or_load(coin_id, PRICE_BATCHER.get)
+        return {"message": f"The current price of {query.upper()} is ${price:.2f} USD."}
+    except UpstreamUnavailable as e:
+        # Circuit open or rate limited, and no recent cached price to serve
+        return {"error": "Price Service Busy", "message": f"{e}. Try again shortly."}
+    except httpx.HTTPError as e:
         return {"error": "Network Error", "message": str(e)}
     except KeyError:
+        return {"message": f"Unable to retrieve the price for '{query}'."}
+    except ValueError:
         return {"error": "Data Error", "message": f"Invalid response for query: {query}"}
 
+def crypto_prices(symbols: List[str]) -> dict:
+    """
+    Fetch current USD prices for several cryptocurrencies at once. Use this
+    instead of calling crypto_price repeatedly when comparing coins.
+
+    Parameters:
+    - symbols (list): Cryptocurrency names or symbols (e.g., ["BTC", "ETH", "SOL"]).
+
+    Returns:
+    - dict: Prices in USD by symbol, plus any symbols that could not be priced.
+    """
+    coin_ids = {}
+    not_found = []
+    for symbol in symbols:
+        coin_id = resolve_coin_id(symbol)
+        if coin_id:
+            coin_ids[symbol.upper()] = coin_id
+        else:
+            not_found.append(symbol)
+
+    # Hits are served from the cache; the misses share single-flight loads
+    # and batches with concurrent crypto_price calls
+    prices, errors = PRICE_CACHE.get_or_load_many(coin_ids.values(), PRICE_BATCHER.get_many)
+    # Coins CoinGecko has no price for are only reported as unavailable
+    error = next((e for e in errors.values() if not isinstance(e, KeyError)), None)
+
+    result = {
+        "prices_usd": {
+            symbol: round(prices[coin_id], 8)
+            for symbol, coin_id in coin_ids.items()
+            if coin_id in prices
+        }
+    }
+    unavailable = not_found + [symbol for symbol, coin_id in coin_ids.items() if coin_id not in prices]
+    if unavailable:
+        result["unavailable"] = unavailable
+    if isinstance(error, httpx.HTTPError):
+        result["error"] = f"Network Error: {error}"
+    elif error:
+        result["error"] = f"Data Error: {error}"
+    return result
+
+
+def get_metrics() -> dict:
+    # Counters exposed by the /metrics endpoint
+    return {
+        "price_cache": PRICE_CACHE.stats(),
+        "price_batcher": PRICE_BATCHER.stats(),
+        "upstreams": HTTP.stats(),
+        "search": SEARCH.stats(),
+        "rag_answer_cache": RAG_ANSWER_CACHE.stats(),
+        "rag_pipeline": dict(RAG_PIPELINE),
+    }
+
 
 
 def process_onchain_request(request_id, request_type="NOT SPECIFIED"):
@@ -362,7 +681,7 @@ onchain_operations_agent = Agent(
 financial_analyst_agent = Agent(
     name="Financial Analyst Agent",
     instructions="Analyze and monitor financial data, crypto price including TVL changes and network activity in the blockchain ecosystem.",
-    functions=[monitor_tvl_changes, crypto_price, query_rag_knowledge_base, fetch_coin_list]
+    functions=[monitor_tvl_changes, analyze_tvl, detect_tvl_anomalies, crypto_price, crypto_prices, query_rag_knowledge_base, fetch_coin_list]
 )
 
 # Define transfer functions
@@ -383,20 +702,74 @@ triage_agent.functions = [transfer_to_onchain_operations, transfer_to_financial_
 onchain_operations_agent.functions.append(transfer_back_to_triage)
 financial_analyst_agent.functions.append(transfer_back_to_triage)
 
-print("Starting Rivalz AI Agents - Triage, On-Chain Operations, and Financial Analyst Agents")
 
 
 
-async def call_multi_agent(user_input: str):
-    messages = [{"role": "user", "content": user_input}]
-    agent = triage_agent
+# Agents by name, used to resume a session at its last active agent
+AGENTS = {
+    agent.name: agent
+    for agent in (triage_agent, onchain_operations_agent, financial_analyst_agent)
+}
+
+
+# Turns of one conversation run one at a time, so concurrent requests on the
+# same session don't start from the same history and drop each other's turn.
+# Locks live only while a turn holds or waits for them
+SESSION_LOCKS: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+
+def session_lock(session_id: str) -> asyncio.Lock:
+    lock = SESSION_LOCKS.get(session_id)
+    if lock is None:
+        lock = SESSION_LOCKS[session_id] = asyncio.Lock()
+    return lock
+
 
-    # Await the client.run method
-    response = await client.run(agent=agent, messages=messages)
+def load_session(session_id: str) -> Session:
+    # Start a fresh session when the id is unknown or has expired
+    return session_store.get(session_id) or Session(id=session_id)
 
-    # Update messages and agent after response
-    messages.extend(response.messages)
-    agent = response.agent
+
+def save_session(session: Session, messages: list, response) -> None:
+    # Stored trimmed to the context budget, with a summary of older turns,
+    # so every turn loads, runs and saves a bounded history
+    session.messages = client.history_manager.compact(messages + response.messages)
+    session.agent_name = response.agent.name if response.agent else None
+    session_store.save(session)
+
+
+async def evict_expired_sessions(interval: float = 300):
+    # Periodically drop idle sessions so they don't accumulate
+    while True:
+        await asyncio.sleep(interval)
+        evicted = await asyncio.to_thread(session_store.evict_expired)
+        if evicted:
+            logging.info(f"Evicted {evicted} expired sessions")
+
+
+async def preload_completion_client():
+    # Build the OpenAI client off the event loop before the first chat needs it
+    await asyncio.to_thread(lambda: client.client)
+
+
+async def close_clients():
+    # Release pooled connections when the app shuts down
+    await client.close()
+    await asyncio.to_thread(HTTP.close)
+
+
+async def call_multi_agent(user_input: str, session_id: str):
+    # Lets tools such as the RAG query continue this conversation's state
+    CURRENT_SESSION_ID.set(session_id)
+    async with session_lock(session_id):
+        session = load_session(session_id)
+        messages = session.messages + [{"role": "user", "content": user_input}]
+        # Follow-up turns go straight to the agent that handled the last one
+        agent = AGENTS.get(session.agent_name, triage_agent)
+
+        # Await the client.run method
+        response = await client.run(agent=agent, messages=messages)
+        save_session(session, messages, response)
 
     # Process messages from the response
     for message in response.messages:
@@ -407,6 +780,27 @@ async def call_multi_agent(user_input: str):
             return f"\033[93mSystem\033[0m: {message['content']}"
 
 
+async def stream_multi_agent(user_input: str, session_id: str):
+    """
+    Stream a multi-agent turn as events: token deltas, tool call
+    start/end, agent handoffs and a final "done" event.
+    """
+    CURRENT_SESSION_ID.set(session_id)
+    async with session_lock(session_id):
+        session = load_session(session_id)
+        messages = session.messages + [{"role": "user", "content": user_input}]
+        agent = AGENTS.get(session.agent_name, triage_agent)
+
+        events = await client.run(agent=agent, messages=messages, stream=True)
+        async for event in events:
+            if event["type"] == "handoff":
+                yield {**event, "message": f"transferred to {event['agent']}"}
+            elif event["type"] == "done":
+                save_session(session, messages, event["response"])
+                yield {"type": "done", "agent": event["response"].agent.name, "session_id": session_id}
+            else:
+                yield event
+
 
     
 # To run in the termainal locally
@@ -0,0 +1,173 @@
+import time
+import threading
+from typing import Optional
+
+import httpx
+
+
+class UpstreamUnavailable(httpx.HTTPError):
+    # Raised without contacting the upstream; an httpx.HTTPError so existing
+    # network error handling (including serving stale cache entries) applies
+    pass
+
+
+class CircuitOpenError(UpstreamUnavailable):
+    pass
+
+
+class RateLimitExceeded(UpstreamUnavailable):
+    pass
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens per second, up to `burst`.
+
+    `acquire(max_wait)` reserves a token and sleeps until it is due, or
+    returns False without reserving when the wait would exceed
+    `max_wait`. `hold(seconds)` empties the bucket for a while, e.g. when
+    the upstream answers 429 with Retry-After.
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, max_wait: float = 0) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            wait = max(0.0, (1 - self._tokens) / self.rate)
+            if wait > max_wait:
+                return False
+            # Tokens may go negative: later callers queue behind this one
+            self._tokens -= 1
+        if wait:
+            time.sleep(wait)
+        return True
+
+    def hold(self, seconds: float) -> None:
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, -seconds * self.rate)
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls
+    for `reset_timeout` seconds. Then it lets a single probe through
+    (half-open): success closes it, failure opens it again. A probe that
+    was never sent is handed back with `release()`, and one that never
+    reports back is given up on after another `reset_timeout`.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_at = 0.0
+        self._lock = threading.Lock()
+        self.times_opened = 0
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            now = time.monotonic()
+            if self.state == "half_open" and now - self._probe_at >= self.reset_timeout:
+                self._probe_at = now
+                return True
+            if self.state == "open" and now - self._opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                self._probe_at = now
+                return True
+            return False
+
+    def release(self) -> None:
+        # The probe was not sent or did not complete: the next call probes instead
+        with self._lock:
+            if self.state == "half_open":
+                self.state = "open"
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self._failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self.state == "half_open" or self._failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.times_opened += 1
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+
+class UpstreamGuard:
+    """
+    Rate limit and circuit breaker for one upstream host, shared by every
+    request in the process. HTTPClient calls `before_request()` before
+    each attempt (retries included, so retries cannot storm a struggling
+    upstream) and `after_response()` with the outcome, or `cancel()` when
+    the attempt ended without one.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rate_per_minute: float,
+        burst: float = 5,
+        max_wait: float = 2,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30,
+    ):
+        self.name = name
+        self.max_wait = max_wait
+        self.bucket = TokenBucket(rate_per_minute / 60, burst)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "throttled": 0, "rejected": 0, "short_circuited": 0, "failures": 0}
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] += 1
+
+    def before_request(self) -> None:
+        if not self.breaker.allow():
+            self._count("short_circuited")
+            raise CircuitOpenError(f"{self.name} circuit is open after repeated failures")
+        start = time.monotonic()
+        if not self.bucket.acquire(self.max_wait):
+            self.breaker.release()
+            self._count("rejected")
+            raise RateLimitExceeded(f"{self.name} rate limit exceeded")
+        if time.monotonic() - start > 0.001:
+            self._count("throttled")
+        self._count("requests")
+
+    def cancel(self) -> None:
+        # The request was let through but ended without an outcome
+        self.breaker.release()
+
+    def after_response(self, ok: bool, retry_after: Optional[float] = None) -> None:
+        if retry_after:
+            self.bucket.hold(retry_after)
+        if ok:
+            self.breaker.record_success()
+        else:
+            self._count("failures")
+            self.breaker.record_failure()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "circuit": self.breaker.state, "times_opened": self.breaker.times_opened}
@@ -0,0 +1,369 @@
+import os
+import re
+import json
+import shutil
+import hashlib
+import logging
+import zlib
+import functools
+from pathlib import Path
+from typing import Callable, Hashable, Iterable, List, Optional
+
+import numpy as np
+
+from src.services.cache import TTLCache
+
+# Document types the local index can read; PDFs need the optional pypdf
+TEXT_SUFFIXES = {".txt", ".md"}
+PDF_SUFFIX = ".pdf"
+DOCUMENT_SUFFIXES = TEXT_SUFFIXES | {PDF_SUFFIX}
+
+
+def read_document(path: Path) -> List[str]:
+    # Text of every page; plain text files are a single page
+    path = Path(path)
+    if path.suffix.lower() in TEXT_SUFFIXES:
+        return [path.read_text(errors="ignore")]
+    if path.suffix.lower() == PDF_SUFFIX:
+        try:
+            from pypdf import PdfReader
+        except ImportError:
+            raise ImportError("Reading PDFs for the local RAG index requires pypdf (pip install pypdf)")
+        return [page.extract_text() or "" for page in PdfReader(str(path)).pages]
+    raise ValueError(f"Unsupported document type: {path.name}")
+
+
+def chunk_words(text: str, size: int = 200, overlap: int = 40) -> List[str]:
+    # Overlapping windows of `size` words, so passages keep local context
+    words = text.split()
+    if not words:
+        return []
+    step = max(size - overlap, 1)
+    return [" ".join(words[start:start + size]) for start in range(0, max(len(words) - overlap, 1), step)]
+
+
+def tokenize(text: str) -> List[str]:
+    return re.findall(r"\w+", text.lower())
+
+
+@functools.lru_cache(maxsize=100_000)
+def feature_bucket(feature: str, dim: int) -> tuple:
+    # Stable across processes, unlike hash(); one bit picks the sign
+    value = zlib.crc32(feature.encode())
+    return value % dim, 1.0 if value & 0x80000000 else -1.0
+
+
+class HashingEmbedder:
+    """
+    Model-free text embeddings: word unigrams and bigrams hashed into `dim`
+    signed buckets, with sublinear term frequency and optional per-bucket
+    IDF weights fitted on the indexed passages. Runs on the CPU with no
+    model download and is deterministic, so vectors written by one
+    process can be searched by another. Words in `stopwords` are dropped
+    before features are built.
+    """
+
+    def __init__(self, dim: int = 1024, idf: Optional[np.ndarray] = None, stopwords: frozenset = frozenset()):
+        self.dim = dim
+        self.idf = idf
+        self.stopwords = stopwords
+
+    def counts(self, texts: Iterable[str]) -> np.ndarray:
+        texts = list(texts)
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = [token for token in tokenize(text) if token not in self.stopwords]
+            features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+            for feature in features:
+                bucket, sign = feature_bucket(feature, self.dim)
+                matrix[row, bucket] += sign
+        return matrix
+
+    def fit_idf(self, counts: np.ndarray) -> None:
+        document_frequency = np.count_nonzero(counts, axis=0)
+        self.idf = (np.log((1 + len(counts)) / (1 + document_frequency)) + 1).astype(np.float32)
+
+    def weigh(self, counts: np.ndarray) -> np.ndarray:
+        vectors = np.sign(counts) * np.log1p(np.abs(counts))
+        if self.idf is not None:
+            vectors *= self.idf
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def embed(self, texts: Iterable[str]) -> np.ndarray:
+        return self.weigh(self.counts(texts))
+
+
+def spherical_kmeans(vectors: np.ndarray, k: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    # Unit-norm centroids maximizing cosine similarity to their members
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=k, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, vectors)
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        # Empty clusters keep their previous centroid
+        centroids = np.where(norms > 0, sums / np.maximum(norms, 1e-12), centroids)
+    return centroids
+
+
+class IVFIndex:
+    """
+    Inverted-file ANN index over unit vectors, stored as .npy files and
+    memory-mapped for search.
+
+    Vectors are clustered with spherical k-means into about sqrt(n)
+    lists and stored contiguously by list. A search scores the centroids,
+    then only the vectors in the `nprobe` closest lists, so it touches a
+    small slice of the mapped file.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.centroids = np.load(self.directory / "centroids.npy", mmap_mode="r")
+        self.vectors = np.load(self.directory / "vectors.npy", mmap_mode="r")
+        self.offsets = np.load(self.directory / "offsets.npy")
+        self.ids = np.load(self.directory / "ids.npy", mmap_mode="r")
+
+    @staticmethod
+    def write(directory: Path, vectors: np.ndarray, iterations: int = 10) -> None:
+        lists = max(1, min(int(np.sqrt(len(vectors))), len(vectors)))
+        centroids = spherical_kmeans(vectors, lists, iterations)
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        order = np.argsort(assignment, kind="stable")
+        offsets = np.searchsorted(assignment[order], np.arange(lists + 1))
+        np.save(directory / "centroids.npy", centroids.astype(np.float32))
+        np.save(directory / "vectors.npy", vectors[order].astype(np.float32))
+        np.save(directory / "offsets.npy", offsets.astype(np.int64))
+        np.save(directory / "ids.npy", order.astype(np.int64))
+
+    def search(self, query: np.ndarray, k: int = 4, nprobe: int = 8) -> List[tuple]:
+        # (score, id) of the k best vectors in the nprobe closest lists
+        probes = np.argsort(-(self.centroids @ query))[:nprobe]
+        ranges = [(self.offsets[p], self.offsets[p + 1]) for p in probes if self.offsets[p + 1] > self.offsets[p]]
+        if not ranges:
+            return []
+        scores = np.concatenate([self.vectors[start:end] @ query for start, end in ranges])
+        ids = np.concatenate([self.ids[start:end] for start, end in ranges])
+        top = np.argsort(-scores)[:k] if len(scores) <= k else np.argpartition(-scores, k)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(float(scores[i]), int(ids[i])) for i in top]
+
+
+class Retriever:
+    """
+    Source of RAG context for query_rag_knowledge_base. `query()` returns
+    a dict with "status" and either "context" (plus "response" when the
+    backend generates one) or "message" on failure.
+    """
+
+    name = "base"
+
+    def ready(self) -> bool:
+        raise NotImplementedError
+
+    def query(self, query: str, k: int = 4) -> dict:
+        raise NotImplementedError
+
+    def version(self) -> Optional[str]:
+        # Changes whenever the documents behind the answers change
+        raise NotImplementedError
+
+    def cache_scope(self) -> Optional[Hashable]:
+        # Who may share a cached answer: None when answers carry no conversation context
+        return None
+
+
+class LocalRetriever(Retriever):
+    """
+    Top-k passages from a local IVF index over the documents, in
+    milliseconds and without a network round trip. `build()` chunks and
+    embeds the documents and is skipped when the index was already built
+    from the same files.
+    """
+
+    name = "local"
+
+    def __init__(self, index_dir: Path, dim: int = 1024, chunk_words: int = 200, chunk_overlap: int = 40, nprobe: int = 8):
+        self.index_dir = Path(index_dir)
+        self.dim = dim
+        self.chunk_words = chunk_words
+        self.chunk_overlap = chunk_overlap
+        self.nprobe = nprobe
+        # (index, passages, embedder, version), swapped as one reference on reload
+        self._state: Optional[tuple] = None
+        self.load()
+
+    def load(self) -> bool:
+        if not (self.index_dir / "meta.json").exists():
+            return False
+        with open(self.index_dir / "passages.json") as f:
+            passages = json.load(f)
+        with open(self.index_dir / "meta.json") as f:
+            version = hashlib.sha256(json.dumps(json.load(f)["fingerprint"]).encode()).hexdigest()
+        embedder = HashingEmbedder(self.dim, np.load(self.index_dir / "idf.npy"))
+        self._state = (IVFIndex(self.index_dir), passages, embedder, version)
+        return True
+
+    def ready(self) -> bool:
+        return self._state is not None
+
+    def version(self) -> Optional[str]:
+        state = self._state
+        return state[3] if state else None
+
+    def fingerprint(self, paths: Iterable[Path]) -> List[list]:
+        return sorted([Path(p).name, os.path.getsize(p), int(os.path.getmtime(p))] for p in paths)
+
+    def build(self, paths: Iterable[Path]) -> int:
+        """
+        Index the documents, unless the current index was built from the
+        same files. Returns the number of indexed passages.
+        """
+        paths = [Path(p) for p in paths]
+        fingerprint = self.fingerprint(paths)
+        meta_path = self.index_dir / "meta.json"
+        if meta_path.exists():
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if meta.get("fingerprint") == fingerprint and meta.get("dim") == self.dim:
+                if not self.ready():
+                    self.load()
+                return meta["passages"]
+
+        passages = []
+        for path in paths:
+            try:
+                pages = read_document(path)
+            except (ImportError, ValueError) as e:
+                logging.warning(f"Skipping {path.name}: {e}")
+                continue
+            for page_number, text in enumerate(pages, start=1):
+                for chunk in chunk_words(text, self.chunk_words, self.chunk_overlap):
+                    passages.append({"text": chunk, "source": path.name, "page": page_number})
+        if not passages:
+            return 0
+
+        embedder = HashingEmbedder(self.dim)
+        counts = embedder.counts(passage["text"] for passage in passages)
+        embedder.fit_idf(counts)
+        vectors = embedder.weigh(counts)
+
+        # Write next to the live index and swap directories when complete
+        staging = self.index_dir.with_name(self.index_dir.name + ".tmp")
+        shutil.rmtree(staging, ignore_errors=True)
+        staging.mkdir(parents=True)
+        IVFIndex.write(staging, vectors)
+        np.save(staging / "idf.npy", embedder.idf)
+        with open(staging / "passages.json", "w") as f:
+            json.dump(passages, f)
+        with open(staging / "meta.json", "w") as f:
+            json.dump({"dim": self.dim, "passages": len(passages), "fingerprint": fingerprint}, f)
+        previous = self.index_dir.with_name(self.index_dir.name + ".old")
+        shutil.rmtree(previous, ignore_errors=True)
+        if self.index_dir.exists():
+            os.replace(self.index_dir, previous)
+        os.replace(staging, self.index_dir)
+        shutil.rmtree(previous, ignore_errors=True)
+        self.load()
+        return len(passages)
+
+    def query(self, query: str, k: int = 4) -> dict:
+        state = self._state
+        if state is None:
+            return {"status": "error", "message": "Local knowledge base index not built"}
+        index, passages, embedder, _ = state
+        hits = index.search(embedder.embed([query])[0], k, self.nprobe)
+        return {
+            "status": "success",
+            "context": [
+                {**passages[passage_id], "score": round(score, 3)}
+                for score, passage_id in hits
+                if score > 0
+            ],
+        }
+
+
+def chat_session_id_of(response: dict) -> Optional[str]:
+    # The session id may be top level or under "data", in any of these spellings
+    for payload in (response, response.get("data")):
+        if isinstance(payload, dict):
+            for key in ("session_id", "sessionId", "sessionID"):
+                if payload.get(key):
+                    return payload[key]
+    return None
+
+
+class RivalzRetriever(Retriever):
+    """
+    Remote RAG through a Rivalz chat session on the knowledge base, which
+    also returns a generated answer alongside the context.
+
+    Each conversation (from `get_conversation_id`) keeps its Rivalz chat
+    session for `session_ttl` seconds, so follow-up questions continue the
+    same server-side session instead of creating a new one per query. A
+    session the server no longer accepts is replaced once. The knowledge
+    base id is known before the knowledge base finishes indexing, so it is
+    only queried once `get_ready` says it is ready.
+    """
+
+    name = "rivalz"
+
+    def __init__(
+        self,
+        get_client: Callable,
+        get_knowledge_base_id: Callable[[], Optional[str]],
+        get_conversation_id: Callable[[], Optional[str]] = lambda: None,
+        get_document_ids: Callable[[], List[str]] = lambda: [],
+        get_ready: Callable[[], bool] = lambda: True,
+        session_ttl: float = 3600,
+    ):
+        self.get_client = get_client
+        self.get_knowledge_base_id = get_knowledge_base_id
+        self.get_ready = get_ready
+        self.get_document_ids = get_document_ids
+        self.get_conversation_id = get_conversation_id
+        self.chat_sessions = TTLCache(ttl=session_ttl, maxsize=10000)
+
+    def ready(self) -> bool:
+        return bool(self.get_knowledge_base_id()) and self.get_ready()
+
+    def version(self) -> Optional[str]:
+        # The knowledge base and the documents added to it
+        documents = hashlib.sha256("\n".join(map(str, self.get_document_ids())).encode()).hexdigest()
+        return f"{self.get_knowledge_base_id()}:{documents}"
+
+    def query(self, query: str, k: int = 4) -> dict:
+        knowledge_base_id = self.get_knowledge_base_id()
+        if not knowledge_base_id:
+            return {"error": "Knowledge base not initialized"}
+
+        conversation_id = self.get_conversation_id()
+        # Keyed by knowledge base too: a new knowledge base needs new sessions
+        key = (conversation_id, knowledge_base_id)
+        chat_session_id = self.chat_sessions.get(key) if conversation_id else None
+        client = self.get_client()
+        try:
+            chat_response = client.create_chat_session(knowledge_base_id, query, chat_session_id)
+        except Exception:
+            if not chat_session_id:
+                raise
+            chat_response = client.create_chat_session(knowledge_base_id, query)
+        if conversation_id:
+            new_session_id = chat_session_id_of(chat_response)
+            if new_session_id:
+                self.chat_sessions.set(key, new_session_id)
+
+        return {
+            "status": "success",
+            "response": chat_response.get("response", "No response"),
+            "context": chat_response.get("context", []),
+        }
+
+    def cache_scope(self) -> Optional[Hashable]:
+        # Answers depend on the conversation's chat session
+        return self.get_conversation_id()
+
+    def stats(self) -> dict:
+        return self.chat_sessions.stats()
@@ -0,0 +1,116 @@
+import re
+import json
+import asyncio
+import functools
+from pathlib import Path
+from typing import Dict, List
+
+from src.services.cache import TTLCache
+
+
+def normalize_query(query: str) -> str:
+    # Case, punctuation and spacing differences share one cache entry
+    return " ".join(re.findall(r"\w+", query.lower()))
+
+
+class SearchBackend:
+    """
+    Web search provider. `search()` is blocking and returns results as
+    {"title", "url", "snippet"} dicts, best first.
+    """
+
+    name = "base"
+
+    def search(self, query: str, max_results: int = 10) -> List[Dict[str, str]]:
+        raise NotImplementedError
+
+
+class DuckDuckGoBackend(SearchBackend):
+    """Live DuckDuckGo search through langchain, imported on first use."""
+
+    name = "duckduckgo"
+
+    @functools.cached_property
+    def wrapper(self):
+        from langchain_community.utilities import DuckDuckGoSearchAPIWrapper
+
+        return DuckDuckGoSearchAPIWrapper()
+
+    def search(self, query: str, max_results: int = 10) -> List[Dict[str, str]]:
+        return [
+            {"title": result.get("title", ""), "url": result.get("link", ""), "snippet": result.get("snippet", "")}
+            for result in self.wrapper.results(query, max_results)
+        ]
+
+
+class FixtureBackend(SearchBackend):
+    """
+    Offline search over a JSON list of {"title", "url", "snippet"} entries,
+    ranked by how many query words each entry contains. Used by tests and
+    benchmarks so they do not depend on the network.
+    """
+
+    name = "fixture"
+
+    def __init__(self, path: Path):
+        with open(path) as f:
+            self.entries = json.load(f)
+        self._words = [
+            set(normalize_query(f"{entry['title']} {entry['snippet']}").split()) for entry in self.entries
+        ]
+
+    def search(self, query: str, max_results: int = 10) -> List[Dict[str, str]]:
+        words = set(normalize_query(query).split())
+        scored = [(len(words & entry_words), i) for i, entry_words in enumerate(self._words)]
+        ranked = sorted((item for item in scored if item[0]), key=lambda item: (-item[0], item[1]))
+        return [dict(self.entries[i]) for _, i in ranked[:max_results]]
+
+
+class CachedSearch:
+    """
+    Async front end for a SearchBackend. Results are cached by normalized
+    query (LRU + TTL, stale results served if the backend fails), so
+    concurrent identical searches share one backend call. The blocking
+    search runs in a worker thread under a hard timeout, so it never
+    stalls the event loop. A search that times out still fills the cache
+    when it completes.
+    """
+
+    def __init__(
+        self,
+        backend: SearchBackend,
+        ttl: float = 3600,
+        stale_ttl: float = 86400,
+        maxsize: int = 1000,
+        timeout: float = 8,
+        max_results: int = 10,
+    ):
+        self.backend = backend
+        self.timeout = timeout
+        self.max_results = max_results
+        self.cache = TTLCache(ttl=ttl, stale_ttl=stale_ttl, maxsize=maxsize)
+
+    async def search(self, query: str) -> List[Dict[str, str]]:
+        # Raises asyncio.TimeoutError when the backend is too slow
+        key = normalize_query(query)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        return await asyncio.wait_for(
+            asyncio.to_thread(self.cache.get_or_load, key, self._load),
+            timeout=self.timeout,
+        )
+
+    def _load(self, key: str) -> List[Dict[str, str]]:
+        return self.backend.search(key, self.max_results)
+
+    def stats(self) -> dict:
+        return {"backend": self.backend.name, **self.cache.stats()}
+
+
+def create_search_backend(name: str, fixture_path: Path) -> SearchBackend:
+    if name == "duckduckgo":
+        return DuckDuckGoBackend()
+    if name == "fixture":
+        return FixtureBackend(fixture_path)
+    raise ValueError(f"Unknown search backend: {name}")
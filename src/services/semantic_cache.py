@@ -0,0 +1,107 @@
+import time
+import threading
+from typing import Any, Hashable, List, Optional
+
+import numpy as np
+
+from src.services.retrieval import HashingEmbedder
+
+# Fillers that say nothing about what is being asked. Question words stay:
+# "when can I stake" and "how do I stake" are different questions
+QUERY_STOPWORDS = frozenset(
+    """a about an and any are can could did do does explain for give i is it me my of on or please s
+    should tell that the this to us was we will with would you""".split()
+)
+
+
+class SemanticCache:
+    """
+    Answer cache keyed by query meaning rather than exact text.
+
+    Queries are embedded (fillers dropped, so "how do I stake" and "how
+    can I stake" coincide, while "when can I stake" does not) and a
+    lookup returns the answer of the most similar cached query when the
+    cosine similarity reaches `threshold`. Entries stored with a `scope`
+    (e.g. the conversation whose context shaped the answer) only match
+    lookups with the same scope. Every entry belongs to a `version` of
+    the underlying documents; a lookup or store with a different version
+    empties the cache, so answers never outlive the knowledge base they
+    came from. Entries expire after `ttl` seconds and the least recently
+    used is replaced when the cache is full.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.9,
+        maxsize: int = 1000,
+        ttl: float = 86400,
+        embedder: Optional[HashingEmbedder] = None,
+    ):
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.embedder = embedder or HashingEmbedder(1024, stopwords=QUERY_STOPWORDS)
+        self._lock = threading.Lock()
+        self._vectors = np.zeros((maxsize, self.embedder.dim), dtype=np.float32)
+        self._values: List[Any] = [None] * maxsize
+        self._created = np.zeros(maxsize)
+        self._scopes = np.zeros(maxsize, dtype=np.int64)
+        self._used = np.zeros(maxsize)
+        self._size = 0
+        self._version: Optional[Hashable] = None
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def _check_version(self, version: Hashable) -> None:
+        if version != self._version:
+            if self._size:
+                self._stats["invalidations"] += 1
+            self._size = 0
+            self._values = [None] * self.maxsize
+            self._version = version
+
+    def _best(self, vector: np.ndarray, scope: int) -> tuple:
+        # Slot and similarity of the closest live entry in the scope, or (None, 0)
+        if not self._size:
+            return None, 0.0
+        scores = self._vectors[:self._size] @ vector
+        scores[time.monotonic() - self._created[:self._size] >= self.ttl] = -1
+        scores[self._scopes[:self._size] != scope] = -1
+        slot = int(np.argmax(scores))
+        return slot, float(scores[slot])
+
+    def get(self, query: str, version: Hashable, scope: Optional[Hashable] = None) -> Optional[Any]:
+        vector = self.embedder.embed([query])[0]
+        with self._lock:
+            self._check_version(version)
+            slot, score = self._best(vector, hash(scope))
+            if slot is None or score < self.threshold or not vector.any():
+                self._stats["misses"] += 1
+                return None
+            self._stats["hits"] += 1
+            self._used[slot] = time.monotonic()
+            return self._values[slot]
+
+    def set(self, query: str, version: Hashable, value: Any, scope: Optional[Hashable] = None) -> None:
+        vector = self.embedder.embed([query])[0]
+        if not vector.any():
+            # Nothing but stopwords: too vague to match other queries safely
+            return
+        with self._lock:
+            self._check_version(version)
+            slot, score = self._best(vector, hash(scope))
+            if slot is None or score < 0.999:
+                if self._size < self.maxsize:
+                    slot = self._size
+                    self._size += 1
+                else:
+                    slot = int(np.argmin(self._used))
+            now = time.monotonic()
+            self._vectors[slot] = vector
+            self._values[slot] = value
+            self._created[slot] = now
+            self._scopes[slot] = hash(scope)
+            self._used[slot] = now
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "size": self._size}
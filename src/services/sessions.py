@@ -0,0 +1,162 @@
+import json
+import time
+import threading
+import contextvars
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel
+
+from src.services.storage import LazySQLite
+
+
+# Id of the conversation being served, so tools can keep per-conversation state
+CURRENT_SESSION_ID: contextvars.ContextVar = contextvars.ContextVar("current_session_id", default=None)
+
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS sessions (
+        id TEXT PRIMARY KEY,
+        agent_name TEXT,
+        messages TEXT NOT NULL,
+        updated_at REAL NOT NULL
+    )
+"""
+
+
+class Session(BaseModel):
+    # Conversation state persisted between /chat turns
+    id: str
+    messages: List = []
+    agent_name: Optional[str] = None  # Active agent when the last turn ended
+    updated_at: float = 0.0
+
+
+class SessionStore:
+    """
+    Base class for session backends. Sessions idle for longer than
+    `ttl_seconds` are treated as missing and evicted.
+    """
+
+    def __init__(self, ttl_seconds: float = 3600):
+        self.ttl_seconds = ttl_seconds
+
+    def is_expired(self, session: Session, now: float = None) -> bool:
+        return (now or time.time()) - session.updated_at > self.ttl_seconds
+
+    def get(self, session_id: str) -> Optional[Session]:
+        raise NotImplementedError
+
+    def save(self, session: Session) -> None:
+        raise NotImplementedError
+
+    def delete(self, session_id: str) -> None:
+        raise NotImplementedError
+
+    def evict_expired(self) -> int:
+        raise NotImplementedError
+
+
+class InMemorySessionStore(SessionStore):
+    # Process-local store; sessions are lost on restart
+
+    def __init__(self, ttl_seconds: float = 3600):
+        super().__init__(ttl_seconds)
+        self._sessions: Dict[str, Session] = {}
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> Optional[Session]:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session and self.is_expired(session):
+                del self._sessions[session_id]
+                return None
+            return session
+
+    def save(self, session: Session) -> None:
+        session.updated_at = time.time()
+        with self._lock:
+            self._sessions[session.id] = session
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def evict_expired(self) -> int:
+        now = time.time()
+        with self._lock:
+            expired = [
+                session_id
+                for session_id, session in self._sessions.items()
+                if self.is_expired(session, now)
+            ]
+            for session_id in expired:
+                del self._sessions[session_id]
+        return len(expired)
+
+
+class SQLiteSessionStore(SessionStore):
+    # Sessions survive restarts and can be shared by workers on one host
+
+    def __init__(self, path: str, ttl_seconds: float = 3600):
+        super().__init__(ttl_seconds)
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = LazySQLite(path, SCHEMA)
+
+    def get(self, session_id: str) -> Optional[Session]:
+        with self._lock:
+            row = self._db.conn.execute(
+                "SELECT agent_name, messages, updated_at FROM sessions WHERE id = ? AND updated_at >= ?",
+                (session_id, time.time() - self.ttl_seconds),
+            ).fetchone()
+        if not row:
+            return None
+        agent_name, messages, updated_at = row
+        return Session(
+            id=session_id,
+            messages=json.loads(messages),
+            agent_name=agent_name,
+            updated_at=updated_at,
+        )
+
+    def save(self, session: Session) -> None:
+        session.updated_at = time.time()
+        with self._lock:
+            self._db.conn.execute(
+                "INSERT OR REPLACE INTO sessions (id, agent_name, messages, updated_at) VALUES (?, ?, ?, ?)",
+                (session.id, session.agent_name, json.dumps(session.messages), session.updated_at),
+            )
+            self._db.conn.commit()
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._db.conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+            self._db.conn.commit()
+
+    def evict_expired(self) -> int:
+        with self._lock:
+            cursor = self._db.conn.execute(
+                "DELETE FROM sessions WHERE updated_at < ?",
+                (time.time() - self.ttl_seconds,),
+            )
+            self._db.conn.commit()
+        return cursor.rowcount
+
+
+def create_session_store(backend: str, ttl_seconds: float, path: str = None) -> SessionStore:
+    """
+    Build the session store selected by configuration.
+
+    Args:
+        backend (str): "memory" or "sqlite"
+        ttl_seconds (float): Idle time after which a session expires
+        path (str): Database file for the sqlite backend
+
+    Returns:
+        SessionStore: The configured store
+    """
+    if backend == "memory":
+        return InMemorySessionStore(ttl_seconds)
+    if backend == "sqlite":
+        return SQLiteSessionStore(path, ttl_seconds)
+    raise ValueError(f"Unknown session backend: {backend}")
@@ -0,0 +1,93 @@
+import os
+import json
+import time
+import threading
+from pathlib import Path
+from typing import Any
+
+from src.services.storage import LazySQLite
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, every process acts as the leader
+    fcntl = None
+
+
+class LeaderLock:
+    """
+    Elects one leader among the worker processes on a host: an exclusive,
+    non-blocking flock on a shared file. `acquire()` is cheap and can be
+    called on every iteration of a background loop. The lock is held for
+    the life of the process and released by the OS when it exits, so a
+    follower's next `acquire()` takes over from a leader that died.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._file = None
+        self._lock = threading.Lock()
+
+    @property
+    def held(self) -> bool:
+        return self._file is not None or fcntl is None
+
+    def acquire(self) -> bool:
+        with self._lock:
+            if self.held:
+                return True
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            f = open(self.path, "a+")
+            try:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                f.close()
+                return False
+            # The leader's pid, for whoever inspects the lock file
+            f.seek(0)
+            f.truncate()
+            f.write(f"{os.getpid()}\n")
+            f.flush()
+            self._file = f
+            return True
+
+    def release(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+                self._file.close()
+                self._file = None
+
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS shared_state (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL,
+        updated_at REAL NOT NULL
+    )
+"""
+
+
+class SharedState:
+    """
+    JSON values by key in SQLite, shared by the worker processes on one
+    host. The leader publishes what it produced (e.g. the knowledge base
+    id) and followers read it instead of producing it themselves.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = LazySQLite(path, SCHEMA)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            row = self._db.conn.execute("SELECT value FROM shared_state WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._db.conn.execute(
+                "INSERT OR REPLACE INTO shared_state (key, value, updated_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time()),
+            )
+            self._db.conn.commit()
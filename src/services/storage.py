@@ -0,0 +1,44 @@
+import os
+import sqlite3
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+
+def atomic_write(path: Path, data: bytes) -> None:
+    # Write to a temporary file next to `path` and rename it over `path`,
+    # so readers see the old or the new contents, never a partial file
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class LazySQLite:
+    """
+    SQLite connection in WAL mode, opened and given its schema on first
+    use, so importing a module that creates a store creates no file. It
+    has no lock of its own: stores use `conn` with their lock held.
+    """
+
+    def __init__(self, path: str, schema: str):
+        self.path = path
+        self.schema = schema
+        self._conn: Optional[sqlite3.Connection] = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(self.schema)
+            conn.commit()
+            self._conn = conn
+        return self._conn
@@ -0,0 +1,147 @@
+import json
+import time
+import random
+import logging
+import contextvars
+from typing import Optional
+
+# Span of the surrounding run/completion/tool call, if any
+CURRENT_SPAN: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+
+class NoopSpan:
+    # Returned for unsampled work; every operation is a no-op
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attributes) -> None:
+        pass
+
+
+NOOP_SPAN = NoopSpan()
+
+
+class Tracer:
+    """
+    Default tracer: records nothing. span() hands back a shared no-op
+    span, so instrumented code costs a method call when tracing is off.
+    """
+
+    def span(self, name: str, **attributes):
+        return NOOP_SPAN
+
+
+class Span:
+    __slots__ = ("tracer", "name", "attributes", "trace_id", "span_id", "parent_id", "start", "token")
+
+    def __init__(self, tracer, name: str, attributes: dict, parent: Optional["Span"]):
+        self.tracer = tracer
+        self.name = name
+        self.attributes = attributes
+        self.trace_id = parent.trace_id if parent else random.getrandbits(64)
+        self.span_id = random.getrandbits(64)
+        self.parent_id = parent.span_id if parent else None
+        self.start = 0.0
+        self.token = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        self.token = CURRENT_SPAN.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        try:
+            CURRENT_SPAN.reset(self.token)
+        except ValueError:
+            # Exited from another context, e.g. an async generator resumed elsewhere
+            pass
+        if exc_type:
+            self.attributes["error"] = exc_type.__name__
+        self.tracer.export(self, duration)
+        return False
+
+    def set(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    def to_dict(self, duration: float) -> dict:
+        record = {
+            "trace_id": f"{self.trace_id:016x}",
+            "span_id": f"{self.span_id:016x}",
+            "parent_id": f"{self.parent_id:016x}" if self.parent_id else None,
+            "span": self.name,
+            "duration_ms": round(duration * 1000, 3),
+        }
+        for key, value in self.attributes.items():
+            # Callables are lazy attributes, only evaluated for exported spans
+            record[key] = value() if callable(value) else value
+        return record
+
+
+class LazyJSON:
+    # Defers JSON encoding until a log handler actually formats the record
+
+    def __init__(self, span: Span, duration: float):
+        self.span = span
+        self.duration = duration
+
+    def __str__(self) -> str:
+        return json.dumps(self.span.to_dict(self.duration), default=str)
+
+
+class UnsampledRoot(NoopSpan):
+    # Marks the trace as unsampled so child spans skip recording too
+
+    def __enter__(self):
+        self.token = CURRENT_SPAN.set(NOOP_SPAN)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            CURRENT_SPAN.reset(self.token)
+        except ValueError:
+            pass
+        return False
+
+
+class LoggingTracer(Tracer):
+    """
+    Emits one structured JSON log line per finished span.
+
+    The sampling decision is made once per trace, at its root span, and
+    inherited by every child span of that trace.
+    """
+
+    def __init__(self, sample_rate: float = 1.0, logger_name: str = "swarm.trace"):
+        self.sample_rate = sample_rate
+        self.logger = logging.getLogger(logger_name)
+        if not self.logger.handlers:
+            handler = logging.StreamHandler()
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self.logger.addHandler(handler)
+            self.logger.setLevel(logging.INFO)
+            self.logger.propagate = False
+
+    def span(self, name: str, **attributes):
+        parent = CURRENT_SPAN.get()
+        if parent is None:
+            if random.random() >= self.sample_rate:
+                # Unsampled root; children see NOOP_SPAN as their parent
+                return UnsampledRoot()
+        elif parent is NOOP_SPAN:
+            return NOOP_SPAN
+        return Span(self, name, attributes, parent)
+
+    def export(self, span: Span, duration: float) -> None:
+        self.logger.info("%s", LazyJSON(span, duration))
+
+
+def create_tracer(sample_rate: float) -> Tracer:
+    # Tracing is off (no-op) unless a positive sample rate is configured
+    if sample_rate > 0:
+        return LoggingTracer(sample_rate)
+    return Tracer()
@@ -0,0 +1,290 @@
+import threading
+from array import array
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+# Chains below this TVL at the baseline are left out of rankings as noise
+MIN_TVL = 1_000_000
+
+
+# Vectorized primitives over a (snapshots x chains) matrix; missing values are NaN
+
+def pct_change(values: np.ndarray, periods: int = 1) -> np.ndarray:
+    # Percent change of every chain over `periods` rows
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change = np.subtract(values[periods:], values[:-periods])
+        change /= values[:-periods]
+        change *= 100
+    change[np.isinf(change)] = np.nan
+    return change
+
+
+def _rolling_sums(values: np.ndarray, window: int) -> Tuple[np.ndarray, np.ndarray]:
+    # Sum and count of non-NaN values in every trailing window, via cumulative sums
+    valid = ~np.isnan(values)
+    sums = np.zeros((len(values) + 1,) + values.shape[1:])
+    counts = np.zeros((len(values) + 1,) + values.shape[1:], dtype=np.int32)
+    np.cumsum(np.where(valid, values, 0.0), axis=0, out=sums[1:])
+    np.cumsum(valid, axis=0, dtype=np.int32, out=counts[1:])
+    sums = np.subtract(sums[window:], sums[:-window], out=sums[window:])
+    return sums, counts[window:] - counts[:-window]
+
+
+def ranks(values: np.ndarray) -> np.ndarray:
+    # 1-based rank by TVL, largest first, along the last axis; NaN stays unranked
+    missing = np.isnan(values)
+    order = np.argsort(np.where(missing, np.inf, -values), axis=-1)
+    result = np.empty(values.shape)
+    np.put_along_axis(result, order, np.broadcast_to(np.arange(1.0, values.shape[-1] + 1), values.shape), axis=-1)
+    result[missing] = np.nan
+    return result
+
+
+def dominance(values: np.ndarray) -> np.ndarray:
+    # Share of total TVL held by every chain, in percent
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return values * 100 / np.nansum(values, axis=-1, keepdims=True)
+
+
+def zscores(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Z-score of every snapshot-to-snapshot change against the mean and
+    standard deviation of the `window` changes before it.
+    """
+    changes = pct_change(values)
+    sums, counts = _rolling_sums(changes[:-1], window)
+    squares, _ = _rolling_sums(np.square(changes[:-1]), window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = np.divide(sums, counts, out=sums)
+        variance = np.divide(squares, counts, out=squares)
+        variance -= np.square(mean)
+        std = np.sqrt(np.maximum(variance, 0, out=variance), out=variance)
+        z = np.subtract(changes[window:], mean, out=mean)
+        z /= std
+    z[np.isinf(z)] = np.nan
+    return z
+
+
+class Window(NamedTuple):
+    ts: np.ndarray
+    chains: List[str]
+    values: np.ndarray
+    # Per-chain mean over the window, ignoring missing values
+    mean: np.ndarray
+
+
+class TVLSeries:
+    """
+    In-memory columnar copy of the TVL snapshots: one row per `resolution`
+    seconds (the first snapshot in each period) and one column per chain,
+    with NaN where a chain was missing.
+
+    Rows live in preallocated buffers that double when full, so appending
+    is amortized O(chains). Prefix sums and counts are kept alongside the
+    values, so the mean over any window costs O(chains) however long the
+    history is. Written rows are never modified, which lets `window()`
+    hand out views without copying or holding the lock.
+    """
+
+    def __init__(self, resolution: int = 3600):
+        self.resolution = resolution
+        self._lock = threading.Lock()
+        self._rows = 0
+        self.chains: List[str] = []
+        self._columns: Dict[str, int] = {}
+        self._allocate(0, 0)
+
+    def _allocate(self, capacity: int, width: int) -> None:
+        # New buffers with the existing rows and columns copied in
+        rows, columns = self._rows, len(self.chains)
+        old = getattr(self, "_ts", None)
+        ts = np.zeros(capacity, dtype=np.int64)
+        values = np.full((capacity, width), np.nan)
+        sums = np.zeros((capacity + 1, width))
+        counts = np.zeros((capacity + 1, width), dtype=np.int32)
+        if old is not None:
+            ts[:rows] = self._ts[:rows]
+            values[:rows, :columns] = self._values[:rows, :columns]
+            sums[:rows + 1, :columns] = self._sums[:rows + 1, :columns]
+            counts[:rows + 1, :columns] = self._counts[:rows + 1, :columns]
+        self._ts, self._values, self._sums, self._counts = ts, values, sums, counts
+
+    @classmethod
+    def from_arrays(cls, ts: np.ndarray, chains: List[str], values: np.ndarray, resolution: int = 3600) -> "TVLSeries":
+        series = cls(resolution)
+        series._set(np.asarray(ts, dtype=np.int64), list(chains), np.asarray(values, dtype=float))
+        return series
+
+    def _set(self, ts: np.ndarray, chains: List[str], values: np.ndarray) -> None:
+        valid = ~np.isnan(values)
+        sums = np.zeros((len(ts) + 1, len(chains)))
+        counts = np.zeros((len(ts) + 1, len(chains)), dtype=np.int32)
+        np.cumsum(np.where(valid, values, 0.0), axis=0, out=sums[1:])
+        np.cumsum(valid, axis=0, out=counts[1:])
+        with self._lock:
+            self._ts, self._values, self._sums, self._counts = ts, values, sums, counts
+            self._rows = len(ts)
+            self.chains = chains
+            self._columns = {chain: column for column, chain in enumerate(chains)}
+
+    def load(self, rows: Iterable[Tuple[int, str, float]]) -> int:
+        """
+        Bulk load (ts, chain, tvl) rows in time order, e.g. from
+        TVLStore.history(); replaces any data. Rows are streamed into flat
+        arrays, keeping the first snapshot of every period as append() does.
+        """
+        times, row_index, column_index, tvls = array("q"), array("q"), array("q"), array("d")
+        columns: Dict[str, int] = {}
+        last_ts, period, skip = None, None, False
+        for ts, chain, tvl in rows:
+            if ts != last_ts:
+                last_ts = ts
+                skip = ts // self.resolution == period
+                if not skip:
+                    period = ts // self.resolution
+                    times.append(ts)
+            if skip:
+                continue
+            row_index.append(len(times) - 1)
+            column_index.append(columns.setdefault(chain, len(columns)))
+            tvls.append(tvl)
+        if not times:
+            return 0
+        values = np.full((len(times), len(columns)), np.nan)
+        values[np.frombuffer(row_index, dtype=np.int64), np.frombuffer(column_index, dtype=np.int64)] = np.frombuffer(
+            tvls, dtype=np.float64
+        )
+        self._set(np.frombuffer(times, dtype=np.int64).copy(), list(columns), values)
+        return len(times)
+
+    def append(self, ts: int, tvls: Dict[str, float]) -> None:
+        with self._lock:
+            rows = self._rows
+            if rows and ts // self.resolution <= self._ts[rows - 1] // self.resolution:
+                return
+            new_chains = [chain for chain in tvls if chain not in self._columns]
+            if new_chains or rows == len(self._ts):
+                capacity = max(len(self._ts) * 2, 64) if rows == len(self._ts) else len(self._ts)
+                self._allocate(capacity, len(self.chains) + len(new_chains))
+                for chain in new_chains:
+                    self._columns[chain] = len(self.chains)
+                    self.chains.append(chain)
+            row = np.full(len(self.chains), np.nan)
+            row[[self._columns[chain] for chain in tvls]] = list(tvls.values())
+            valid = ~np.isnan(row)
+            self._ts[rows] = ts
+            self._values[rows] = row
+            self._sums[rows + 1] = self._sums[rows] + np.where(valid, row, 0.0)
+            self._counts[rows + 1] = self._counts[rows] + valid
+            self._rows = rows + 1
+
+    def window(self, hours: Optional[float] = None) -> Window:
+        # Rows from the last snapshot at least `hours` old up to the latest
+        with self._lock:
+            rows, chains = self._rows, list(self.chains)
+            ts, values, sums, counts = self._ts, self._values, self._sums, self._counts
+        width = len(chains)
+        start = 0
+        if hours is not None and rows:
+            start = max(np.searchsorted(ts[:rows], ts[rows - 1] - hours * 3600, side="right") - 1, 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = (sums[rows, :width] - sums[start, :width]) / (counts[rows, :width] - counts[start, :width])
+        return Window(ts[start:rows], chains, values[start:rows, :width], mean)
+
+    @property
+    def last_ts(self) -> Optional[int]:
+        with self._lock:
+            return int(self._ts[self._rows - 1]) if self._rows else None
+
+    def __len__(self) -> int:
+        return self._rows
+
+
+def _round(value: float, digits: int = 2) -> Optional[float]:
+    if np.isnan(value):
+        return None
+    return round(float(value), digits) if digits else int(round(float(value)))
+
+
+def market_structure(series: TVLSeries, hours: int = 24, limit: int = 5) -> Dict:
+    """
+    Dominance, top movers, rank shifts and the distance from the window
+    mean across all chains over the last `hours`.
+    """
+    ts, chains, values, mean = series.window(hours)
+    if len(ts) < 2:
+        return {}
+    first, last = values[0], values[-1]
+    change = pct_change(values[[0, -1]])[0]
+    change[~(first >= MIN_TVL)] = np.nan
+    shift = ranks(first) - ranks(last)
+    share = dominance(last)
+    vs_mean = (last / mean - 1) * 100
+
+    def top(scores: np.ndarray, count: int) -> List[int]:
+        order = np.argsort(-np.nan_to_num(scores, nan=-np.inf))[:count]
+        return [int(column) for column in order if not np.isnan(scores[column]) and scores[column] > 0]
+
+    def entry(column: int) -> Dict:
+        return {
+            "chain": chains[column],
+            "tvl_usd": round(float(last[column])),
+            "change_pct": _round(change[column]),
+            "dominance_pct": _round(share[column]),
+            "vs_window_mean_pct": _round(vs_mean[column]),
+        }
+
+    rank_shift = {chains[column]: int(shift[column]) for column in top(np.abs(shift), limit)}
+    return {
+        "window_hours": round(float(ts[-1] - ts[0]) / 3600, 1),
+        "total_tvl_usd": round(float(np.nansum(last))),
+        "total_change_pct": _round((np.nansum(last) / np.nansum(first) - 1) * 100),
+        "dominance": [entry(column) for column in top(share, limit)],
+        "top_gainers": [entry(column) for column in top(change, limit)],
+        "top_losers": [entry(column) for column in top(-change, limit)],
+        "rank_shifts": rank_shift,
+    }
+
+
+def chain_profile(series: TVLSeries, chain: str, hours: int = 24) -> Dict:
+    # Change, mean, range, rank and dominance of one chain over the last `hours`
+    ts, chains, values, mean = series.window(hours)
+    columns = {name.lower(): column for column, name in enumerate(chains)}
+    column = columns.get(chain.strip().lower())
+    if column is None or len(ts) < 2:
+        return {}
+    current, base = ranks(values[[-1, 0]])[:, column]
+    return {
+        "chain": chains[column],
+        "window_hours": round(float(ts[-1] - ts[0]) / 3600, 1),
+        "tvl_usd": _round(values[-1, column], 0),
+        "change_pct": _round(pct_change(values[[0, -1], column:column + 1])[0, 0]),
+        "mean_usd": _round(mean[column], 0),
+        "min_usd": _round(np.nanmin(values[:, column]), 0),
+        "max_usd": _round(np.nanmax(values[:, column]), 0),
+        "rank": _round(current, 0),
+        "rank_change": _round(base - current, 0),
+        "dominance_pct": _round(dominance(values[-1])[column]),
+    }
+
+
+def anomalies(series: TVLSeries, lookback_hours: int = 168, threshold: float = 3.0, limit: int = 5) -> Dict:
+    # Chains whose latest snapshot-to-snapshot change is an outlier for them
+    ts, chains, values, _ = series.window(lookback_hours)
+    if len(ts) < 4:
+        return {}
+    window = len(values) - 2
+    z = zscores(values, window)[-1]
+    z[~(values[-2] >= MIN_TVL)] = np.nan
+    latest = pct_change(values[-2:])[0]
+    flagged = np.flatnonzero(np.abs(np.nan_to_num(z)) >= threshold)
+    flagged = flagged[np.argsort(-np.abs(z[flagged]))][:limit]
+    return {
+        "lookback_hours": round(float(ts[-1] - ts[0]) / 3600, 1),
+        "threshold": threshold,
+        "anomalies": [
+            {"chain": chains[column], "change_pct": _round(latest[column]), "z_score": _round(z[column])}
+            for column in flagged
+        ],
+    }
@@ -0,0 +1,199 @@
+import time
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from src.services.storage import LazySQLite
+
+# Look-back windows whose changes are precomputed on every poll
+WINDOWS_HOURS = (1, 24, 168)
+
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS snapshots (
+        chain TEXT NOT NULL,
+        ts INTEGER NOT NULL,
+        tvl REAL NOT NULL,
+        PRIMARY KEY (chain, ts)
+    );
+    CREATE INDEX IF NOT EXISTS snapshots_ts ON snapshots (ts);
+    CREATE TABLE IF NOT EXISTS tvl_deltas (
+        window_hours INTEGER NOT NULL,
+        chain TEXT NOT NULL COLLATE NOCASE,
+        tvl REAL NOT NULL,
+        base_tvl REAL NOT NULL,
+        pct_change REAL,
+        ts INTEGER NOT NULL,
+        base_ts INTEGER NOT NULL,
+        PRIMARY KEY (window_hours, chain)
+    );
+    CREATE INDEX IF NOT EXISTS tvl_deltas_pct ON tvl_deltas (window_hours, pct_change);
+    CREATE TABLE IF NOT EXISTS tvl_totals (
+        window_hours INTEGER PRIMARY KEY,
+        tvl REAL NOT NULL,
+        base_tvl REAL NOT NULL,
+        ts INTEGER NOT NULL,
+        base_ts INTEGER NOT NULL
+    );
+"""
+
+
+class TVLStore:
+    """
+    SQLite time series of chain TVL snapshots from DeFiLlama.
+
+    `record()` appends one row per chain and then precomputes, for each
+    window in WINDOWS_HOURS, every chain's change against its latest
+    snapshot at least that old (or the oldest one while the store is
+    younger than the window). Queries read those precomputed rows, so
+    answering does not depend on how much history is stored. With
+    `retention_hours`, snapshots older than that are deleted as new ones
+    are recorded; the longest window plus a day is always kept.
+    """
+
+    def __init__(self, path: str, retention_hours: Optional[float] = None):
+        self.path = path
+        self.retention_hours = max(retention_hours, max(WINDOWS_HOURS) + 24) if retention_hours else None
+        self._lock = threading.Lock()
+        self._db = LazySQLite(path, SCHEMA)
+
+    def record(self, chains: List[dict], ts: Optional[int] = None) -> Dict[str, float]:
+        """
+        Store one snapshot of the /v2/chains payload and refresh the deltas.
+
+        Returns:
+            dict: TVL of every recorded chain
+        """
+        ts = int(ts or time.time())
+        tvls = {
+            chain["name"]: float(chain["tvl"])
+            for chain in chains
+            if isinstance(chain, dict) and chain.get("name") and isinstance(chain.get("tvl"), (int, float))
+        }
+        rows = [(name, ts, tvl) for name, tvl in tvls.items()]
+        with self._lock, self._db.conn:
+            self._db.conn.executemany("INSERT OR REPLACE INTO snapshots (chain, ts, tvl) VALUES (?, ?, ?)", rows)
+            for window in WINDOWS_HOURS:
+                self._update_window(window, ts)
+            if self.retention_hours:
+                self._db.conn.execute("DELETE FROM snapshots WHERE ts < ?", (ts - int(self.retention_hours * 3600),))
+        return tvls
+
+    def _update_window(self, window: int, ts: int) -> None:
+        cutoff = ts - window * 3600
+        # Baseline: the latest snapshot at or before the cutoff, else the oldest one
+        base_ts = self._db.conn.execute("SELECT MAX(ts) FROM snapshots WHERE ts <= ?", (cutoff,)).fetchone()[0]
+        if base_ts is None:
+            base_ts = self._db.conn.execute("SELECT MIN(ts) FROM snapshots").fetchone()[0]
+
+        self._db.conn.execute("DELETE FROM tvl_deltas WHERE window_hours = ?", (window,))
+        self._db.conn.execute(
+            """
+            INSERT INTO tvl_deltas (window_hours, chain, tvl, base_tvl, pct_change, ts, base_ts)
+            SELECT ?, cur.chain, cur.tvl, base.tvl,
+                   CASE WHEN base.tvl > 0 THEN (cur.tvl - base.tvl) * 100.0 / base.tvl END,
+                   cur.ts, base.ts
+            FROM snapshots cur
+            JOIN snapshots base ON base.chain = cur.chain AND base.ts = ?
+            WHERE cur.ts = ?
+            """,
+            (window, base_ts, ts),
+        )
+        self._db.conn.execute(
+            """
+            INSERT OR REPLACE INTO tvl_totals (window_hours, tvl, base_tvl, ts, base_ts)
+            SELECT ?, COALESCE(SUM(tvl), 0), COALESCE(SUM(base_tvl), 0), ?, ?
+            FROM tvl_deltas WHERE window_hours = ?
+            """,
+            (window, ts, base_ts, window),
+        )
+
+    def history(
+        self, since_ts: Optional[float] = None, resolution: Optional[int] = None, batch: int = 65536
+    ) -> Iterator[Tuple[int, str, float]]:
+        """
+        (ts, chain, tvl) snapshots in time order, e.g. to load TVLSeries.
+        With `resolution`, only the first snapshot of every period of that
+        many seconds is returned, downsampled in SQL. Rows are fetched in
+        batches, so a long history is never held in memory at once.
+        """
+        if resolution:
+            query = """
+                SELECT s.ts, s.chain, s.tvl FROM snapshots s
+                JOIN (SELECT MIN(ts) AS ts FROM snapshots WHERE ts >= ? GROUP BY ts / ?) AS first
+                ON s.ts = first.ts
+                ORDER BY s.ts
+            """
+            params = (since_ts or 0, int(resolution))
+        else:
+            query = "SELECT ts, chain, tvl FROM snapshots WHERE ts >= ? ORDER BY ts"
+            params = (since_ts or 0,)
+        with self._lock:
+            cursor = self._db.conn.execute(query, params)
+            rows = cursor.fetchmany(batch)
+        while rows:
+            yield from rows
+            with self._lock:
+                rows = cursor.fetchmany(batch)
+
+    def latest_ts(self) -> Optional[int]:
+        with self._lock:
+            return self._db.conn.execute("SELECT MAX(ts) FROM tvl_totals").fetchone()[0]
+
+    def nearest_window(self, hours: int) -> int:
+        return min(WINDOWS_HOURS, key=lambda window: abs(window - hours))
+
+    def summary(self, hours: int = 24, limit: int = 5) -> Dict:
+        # Total TVL and the top gainers and losers over the nearest window;
+        # chains under $1M at the baseline are left out as noise
+        window = self.nearest_window(hours)
+        with self._lock:
+            total = self._db.conn.execute(
+                "SELECT tvl, base_tvl, ts, base_ts FROM tvl_totals WHERE window_hours = ?", (window,)
+            ).fetchone()
+            movers = {
+                label: self._db.conn.execute(
+                    f"""
+                    SELECT chain, tvl, pct_change FROM tvl_deltas
+                    WHERE window_hours = ? AND pct_change {sign} 0 AND base_tvl >= 1000000
+                    ORDER BY pct_change {order} LIMIT ?
+                    """,
+                    (window, limit),
+                ).fetchall()
+                for label, sign, order in (("top_gainers", ">", "DESC"), ("top_losers", "<", "ASC"))
+            }
+        if not total:
+            return {}
+        tvl, base_tvl, ts, base_ts = total
+        return {
+            "as_of": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(ts)),
+            "window_hours": round((ts - base_ts) / 3600, 1),
+            "total_tvl_usd": round(tvl),
+            "total_change_pct": round((tvl - base_tvl) * 100 / base_tvl, 2) if base_tvl else None,
+            **{
+                label: [
+                    {"chain": chain, "tvl_usd": round(chain_tvl), "change_pct": round(pct, 2)}
+                    for chain, chain_tvl, pct in rows
+                ]
+                for label, rows in movers.items()
+            },
+        }
+
+    def chain(self, name: str) -> Dict:
+        # Current TVL of one chain with its change over every window
+        with self._lock:
+            rows = self._db.conn.execute(
+                "SELECT window_hours, chain, tvl, pct_change, ts, base_ts FROM tvl_deltas WHERE chain = ?",
+                (name,),
+            ).fetchall()
+        if not rows:
+            return {}
+        _, chain, tvl, _, ts, _ = rows[0]
+        return {
+            "chain": chain,
+            "as_of": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(ts)),
+            "tvl_usd": round(tvl),
+            "change_pct": {
+                f"{round((ts - base_ts) / 3600, 1)}h": round(pct, 2) if pct is not None else None
+                for _, _, _, pct, ts, base_ts in rows
+            },
+        }
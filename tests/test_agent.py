@@ -0,0 +1,117 @@
+import json
+import time
+import asyncio
+
+import httpx
+from openai import AsyncOpenAI
+
+from src.services.agent import Agent, ChatCompletionMessageToolCall, Function, Swarm
+
+
+def completion_body(content: str) -> dict:
+    return {
+        "id": "chatcmpl-test",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "gpt-4o",
+        "choices": [{
+            "index": 0,
+            "finish_reason": "stop",
+            "message": {"role": "assistant", "content": content},
+        }],
+        "usage": {"prompt_tokens": 5, "completion_tokens": 1, "total_tokens": 6},
+    }
+
+
+def stream_body(content: str) -> bytes:
+    # The content arrives in two deltas
+    middle = len(content) // 2
+    pieces = [content[:middle], content[middle:]]
+    chunks = [
+        {"choices": [{"index": 0, "delta": {"role": "assistant", "content": piece}, "finish_reason": None}]}
+        for piece in pieces
+    ]
+    events = [
+        {"id": "chatcmpl-test", "object": "chat.completion.chunk", "created": 0, "model": "gpt-4o", **chunk}
+        for chunk in chunks
+    ]
+    return "".join(f"data: {json.dumps(event)}\n\n" for event in events).encode() + b"data: [DONE]\n\n"
+
+
+def real_client(content: str) -> AsyncOpenAI:
+    # The real SDK on a mock transport, so its `create` wrapper is exercised
+    def handler(request: httpx.Request) -> httpx.Response:
+        if json.loads(request.content).get("stream"):
+            return httpx.Response(200, content=stream_body(content), headers={"content-type": "text/event-stream"})
+        return httpx.Response(200, json=completion_body(content))
+
+    return AsyncOpenAI(api_key="test", http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+
+
+def test_run_with_real_async_openai_client():
+    swarm = Swarm(client=real_client("hello"))
+    response = asyncio.run(swarm.run(agent=Agent(), messages=[{"role": "user", "content": "hi"}]))
+    assert response.messages[-1]["content"] == "hello"
+
+
+def test_stream_with_real_async_openai_client():
+    async def collect():
+        swarm = Swarm(client=real_client("hello there"))
+        events = await swarm.run(agent=Agent(), messages=[{"role": "user", "content": "hi"}], stream=True)
+        return [event async for event in events]
+
+    events = asyncio.run(collect())
+    assert events[-1]["type"] == "done"
+    assert events[-1]["response"].messages[-1]["content"] == "hello there"
+
+
+def tool_call(call_id: str, name: str, arguments: str) -> ChatCompletionMessageToolCall:
+    return ChatCompletionMessageToolCall(id=call_id, type="function", function=Function(name=name, arguments=arguments))
+
+
+def slow_echo(text: str, delay: float) -> str:
+    time.sleep(delay)
+    return text
+
+
+async def async_echo(text: str, delay: float) -> str:
+    await asyncio.sleep(delay)
+    return text
+
+
+def failing_tool() -> str:
+    raise RuntimeError("upstream exploded")
+
+
+def test_tool_results_keep_the_call_order():
+    swarm = Swarm(client=object())
+    calls = [
+        tool_call("a", "slow_echo", json.dumps({"text": "first", "delay": 0.2})),
+        tool_call("b", "async_echo", json.dumps({"text": "second", "delay": 0.1})),
+        tool_call("c", "slow_echo", json.dumps({"text": "third", "delay": 0})),
+    ]
+    started = time.perf_counter()
+    response = asyncio.run(swarm.handle_tool_calls(calls, [slow_echo, async_echo]))
+    # Run concurrently, reported in the order the model asked
+    assert time.perf_counter() - started < 0.3
+    assert [(m["tool_call_id"], m["content"]) for m in response.messages] == [
+        ("a", "first"), ("b", "second"), ("c", "third"),
+    ]
+
+
+def test_timeout_and_failures_only_fail_their_own_call():
+    swarm = Swarm(client=object(), tool_timeout=0.1)
+    calls = [
+        tool_call("a", "async_echo", json.dumps({"text": "late", "delay": 5})),
+        tool_call("b", "slow_echo", "{not json"),
+        tool_call("c", "failing_tool", "{}"),
+        tool_call("d", "slow_echo", json.dumps({"text": "ok", "delay": 0})),
+        tool_call("e", "slow_echo", json.dumps({"txt": "wrong name", "delay": 0})),
+    ]
+    response = asyncio.run(swarm.handle_tool_calls(calls, [slow_echo, async_echo, failing_tool]))
+    contents = [message["content"] for message in response.messages]
+    assert contents[0] == "Error: Tool async_echo timed out after 0.1s."
+    assert contents[1].startswith("Error: Invalid arguments for tool slow_echo")
+    assert contents[2] == "Error: Tool failing_tool failed: upstream exploded"
+    assert contents[3] == "ok"
+    assert contents[4].startswith("Error: Tool slow_echo failed")
@@ -0,0 +1,74 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.services.batching import MicroBatcher
+from src.services.cache import TTLCache
+
+
+def test_single_and_many_lookups_share_one_request():
+    calls = []
+    started = threading.Barrier(2)
+
+    def fetch_many(keys):
+        calls.append(sorted(keys))
+        return {key: key.upper() for key in keys if key != "unknown"}
+
+    batcher = MicroBatcher(fetch_many, window=0.2)
+    cache = TTLCache(ttl=60)
+
+    def single():
+        started.wait()
+        return cache.get_or_load("bitcoin", batcher.get)
+
+    def many():
+        started.wait()
+        return cache.get_or_load_many(["bitcoin", "ethereum", "unknown"], batcher.get_many)
+
+    with ThreadPoolExecutor(2) as pool:
+        single_future, many_future = pool.submit(single), pool.submit(many)
+        single_result, (values, errors) = single_future.result(timeout=5), many_future.result(timeout=5)
+    assert single_result == "BITCOIN"
+    assert values == {"bitcoin": "BITCOIN", "ethereum": "ETHEREUM"}
+    assert list(errors) == ["unknown"] and isinstance(errors["unknown"], KeyError)
+    # One upstream call, and bitcoin was requested once
+    assert calls == [["bitcoin", "ethereum", "unknown"]]
+
+
+def test_many_serves_hits_without_loading():
+    cache = TTLCache(ttl=60)
+    cache.set("bitcoin", 1.0)
+    values, errors = cache.get_or_load_many(["bitcoin"], lambda keys: 1 / 0)
+    assert values == {"bitcoin": 1.0} and not errors
+
+
+def test_concurrent_gets_fan_out_from_one_fetch():
+    calls = []
+
+    def fetch_many(keys):
+        calls.append(sorted(keys))
+        return {key: key.upper() for key in keys if key != "unknown"}
+
+    batcher = MicroBatcher(fetch_many, window=0.2)
+    keys = ["bitcoin", "ethereum", "bitcoin", "unknown"]
+    with ThreadPoolExecutor(len(keys)) as pool:
+        futures = [pool.submit(batcher.get, key) for key in keys]
+        assert [future.result(timeout=5) for future in futures[:3]] == ["BITCOIN", "ETHEREUM", "BITCOIN"]
+        with pytest.raises(KeyError):
+            futures[3].result(timeout=5)
+    assert calls == [["bitcoin", "ethereum", "unknown"]]
+
+
+def test_fetch_error_reaches_every_caller_in_the_batch():
+    def fetch_many(keys):
+        raise ConnectionError("upstream down")
+
+    batcher = MicroBatcher(fetch_many, window=0.2)
+    with ThreadPoolExecutor(3) as pool:
+        futures = [pool.submit(batcher.get, key) for key in ["bitcoin", "ethereum", "solana"]]
+        for future in futures:
+            with pytest.raises(ConnectionError):
+                future.result(timeout=5)
+    assert batcher.stats() == {"requests": 3, "batches": 1}
+
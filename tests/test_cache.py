@@ -0,0 +1,59 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.services.cache import TTLCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr("src.services.cache.time.monotonic", lambda: now[0])
+    return now
+
+
+def test_concurrent_misses_share_one_load():
+    cache = TTLCache(ttl=60)
+    calls = []
+    release = threading.Event()
+
+    def loader(key):
+        calls.append(key)
+        release.wait(5)
+        return key.upper()
+
+    with ThreadPoolExecutor(4) as pool:
+        futures = [pool.submit(cache.get_or_load, "bitcoin", loader) for _ in range(4)]
+        # Let every thread reach the cache before the load finishes
+        while cache.stats()["misses"] + cache.stats()["coalesced"] < 4:
+            time.sleep(0.001)
+        release.set()
+        assert [future.result(timeout=5) for future in futures] == ["BITCOIN"] * 4
+    assert calls == ["bitcoin"]
+    assert cache.stats()["coalesced"] == 3
+
+
+def test_failed_load_is_shared_and_not_cached():
+    cache = TTLCache(ttl=60)
+    with pytest.raises(ZeroDivisionError):
+        cache.get_or_load("bitcoin", lambda key: 1 / 0)
+    assert cache.get_or_load("bitcoin", lambda key: 1.0) == 1.0
+
+
+def test_stale_value_is_served_when_reload_fails(clock):
+    cache = TTLCache(ttl=60, stale_ttl=300)
+    cache.set("bitcoin", 1.0)
+
+    def failing(key):
+        raise ConnectionError("upstream down")
+
+    clock[0] = 120
+    assert cache.get_or_load("bitcoin", failing) == 1.0
+    assert cache.stats()["stale"] == 1
+    # A successful reload replaces the stale value
+    assert cache.get_or_load("bitcoin", lambda key: 2.0) == 2.0
+    clock[0] = 500
+    with pytest.raises(ConnectionError):
+        cache.get_or_load("bitcoin", failing)
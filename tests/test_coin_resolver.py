@@ -0,0 +1,90 @@
+from pathlib import Path
+
+import pytest
+
+from src.services.coin_index import CoinIndex
+from src.services.coin_resolver import UNRANKED, CoinResolver
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+MAJORS = {
+    "BTC": "bitcoin",
+    "ETH": "ethereum",
+    "SOL": "solana",
+    "DOGE": "dogecoin",
+}
+
+
+@pytest.fixture(scope="module")
+def seeded_index(tmp_path_factory):
+    # Built from the seed shipped with the repo, before any refresh
+    path = tmp_path_factory.mktemp("coins") / "coin_index.tsv"
+    index = CoinIndex(path, seed_path=ROOT_DIR / "coin_list_cache.json", pinned=MAJORS)
+    index.build_resolver()
+    return index
+
+
+@pytest.mark.parametrize("query, coin_id", [
+    ("Bitcoin", "bitcoin"),
+    ("bitcoin", "bitcoin"),
+    ("BTC", "bitcoin"),
+    ("Ethereum", "ethereum"),
+    ("ether", "ethereum"),
+    ("solana", "solana"),
+    ("bitcon", "bitcoin"),
+    ("etherium", "ethereum"),
+    ("dogecoin", "dogecoin"),
+])
+def test_seeded_index_resolves_majors(seeded_index, query, coin_id):
+    assert seeded_index.resolve(query) == coin_id
+
+
+def test_seeded_snapshot_is_refreshed_at_once(seeded_index):
+    assert seeded_index.age() > 365 * 24 * 3600
+
+
+def test_unranked_word_ticker_does_not_answer_name_like_query():
+    resolver = CoinResolver([
+        ("BITCOIN", "harrypotterobamasonic10inu", "HarryPotterObamaSonic10Inu", UNRANKED),
+        ("BCH", "bitcoin-cash", "Bitcoin Cash", UNRANKED),
+    ])
+    assert resolver.resolve("Bitcoin") == "bitcoin-cash"
+    # Still the answer when nothing else matches
+    assert CoinResolver([("BITCOIN", "harrypotterobamasonic10inu", "Harry", UNRANKED)]).resolve("Bitcoin") == (
+        "harrypotterobamasonic10inu"
+    )
+
+
+def test_ranks_break_ties_between_shared_tickers():
+    resolver = CoinResolver([
+        ("ETH", "the-ticker-is-eth", "The Ticker Is ETH", UNRANKED),
+        ("ETH", "ethereum", "Ethereum", 2),
+    ])
+    assert resolver.resolve("ETH") == "ethereum"
+    assert resolver.resolve("Ethereum") == "ethereum"
+
+
+class FakeHTTP:
+    def __init__(self, coins, markets):
+        self.pages = {"list": coins, "markets": markets}
+
+    def get(self, url, **kwargs):
+        payload = self.pages["markets" if "markets" in url else "list"]
+        if "markets" in url and kwargs["params"]["page"] > 1:
+            payload = []
+        return type("Response", (), {"json": lambda self: payload})()
+
+
+def test_refresh_skips_malformed_rows(tmp_path):
+    coins = [
+        {"id": "bitcoin", "symbol": "btc", "name": "Bitcoin"},
+        {"id": "ethereum", "symbol": "eth"},
+        {"id": None, "symbol": "bad"},
+        {"symbol": "nothing"},
+        "garbage",
+    ]
+    markets = [{"id": "bitcoin", "market_cap_rank": 1}, {"market_cap_rank": 2}, {"id": "ethereum", "market_cap_rank": "2"}]
+    index = CoinIndex(tmp_path / "coin_index.tsv", http=FakeHTTP(coins, markets))
+    assert index.refresh(ranked_pages=2) == 2
+    assert index.resolve("BTC") == "bitcoin"
+    assert index.resolve("ethereum") == "ethereum"
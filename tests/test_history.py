@@ -0,0 +1,72 @@
+from types import SimpleNamespace
+
+from src.services import history
+from src.services.history import MESSAGE_OVERHEAD_TOKENS, SUMMARY_PREFIX, History, HistoryManager
+
+
+def turn(i: int) -> list:
+    return [
+        {"role": "user", "content": f"question {i} " * 10},
+        {"role": "assistant", "content": f"answer {i} " * 20, "sender": "Agent"},
+    ]
+
+
+def test_fit_stays_within_budget_and_keeps_recent_messages():
+    manager = HistoryManager(keep_recent=4)
+    history = History([message for i in range(50) for message in turn(i)])
+    budget = 1500
+    for i in range(50, 150):
+        history.extend(turn(i))
+        fitted = manager.fit(history, budget)
+        assert manager.count(fitted) <= budget - MESSAGE_OVERHEAD_TOKENS
+        assert fitted[-4:] == list(history)[-4:]
+
+
+def test_fit_only_trims_again_when_appended_turns_overflow():
+    manager = HistoryManager(keep_recent=4)
+    trims = []
+    trim = manager.trim
+    manager.trim = lambda *args: trims.append(1) or trim(*args)
+    history = History([message for i in range(200) for message in turn(i)])
+    for i in range(200, 300):
+        history.extend(turn(i))
+        manager.fit(history, 3000)
+    # One trim of the full history, then only when the headroom fills up,
+    # every few turns rather than on every turn
+    assert 1 < len(trims) < 40
+
+
+def test_summary_carries_over_repeated_trims():
+    manager = HistoryManager(keep_recent=4)
+    history = History(turn(0))
+    for i in range(1, 60):
+        history.extend(turn(i))
+        fitted = manager.fit(history, 800)
+    summary = fitted[0]["content"]
+    assert summary.startswith(SUMMARY_PREFIX)
+    # The newest dropped turns are summarized, not lost between trims
+    assert "answered" in summary and "question" in summary
+
+
+
+def test_compacted_conversation_stays_bounded_across_turns():
+    manager = HistoryManager(default_budget=800, keep_recent=4)
+    stored = []
+    for i in range(100):
+        stored = manager.compact(stored + turn(i))
+        assert manager.count(stored) <= 800
+        assert stored[-2:] == turn(i)
+    # Older turns live on in the stored summary
+    assert stored[0]["content"].startswith(SUMMARY_PREFIX)
+    assert manager.compact(turn(0)) == turn(0)
+
+
+def test_encoder_loads_on_first_count(monkeypatch):
+    loads = []
+    encoder = SimpleNamespace(encode=lambda text, disallowed_special: text.split())
+    monkeypatch.setattr(history, "tiktoken", SimpleNamespace(get_encoding=lambda name: loads.append(name) or encoder))
+    manager = HistoryManager()
+    assert loads == []
+    assert manager.count_text("three short words") == 3
+    assert manager.count_text("two words") == 2
+    assert loads == ["cl100k_base"]
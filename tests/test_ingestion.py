@@ -0,0 +1,124 @@
+import asyncio
+
+from src.services.ingestion import IngestionLedger, Ingestor
+
+
+class FakeRivalz:
+    """
+    Knowledge bases in memory. Like the Rivalz API, documents are keyed by
+    file key and adding one answers with the knowledge base and its files.
+    """
+
+    def __init__(self, list_documents_on_create: bool = True, list_documents: bool = True):
+        self.list_documents_on_create = list_documents_on_create
+        self.list_documents = list_documents
+        self.knowledge_bases = {}
+        self.keys = 0
+        self.uploads = []
+        # Names whose upload or add fails, like a dropped request
+        self.failing = set()
+
+    def _file(self, path):
+        self.keys += 1
+        return {"fileKey": f"key-{self.keys}", "name": path.name}
+
+    def upload_file(self, path):
+        if path.name in self.failing:
+            raise ConnectionError("upload failed")
+        self.uploads.append(path.name)
+        return f"hash-{path.name}"
+
+    def create_rag_knowledge_base(self, path, name):
+        knowledge_base_id = f"kb-{len(self.knowledge_bases) + 1}"
+        self.knowledge_bases[knowledge_base_id] = [self._file(path)]
+        files = self.knowledge_bases[knowledge_base_id] if self.list_documents_on_create else None
+        return {"id": knowledge_base_id, "name": name, "files": files}
+
+    def add_document_to_knowledge_base(self, path, knowledge_base_id):
+        if path.name in self.failing:
+            raise ConnectionError("add failed")
+        self.knowledge_bases[knowledge_base_id].append(self._file(path))
+        return {"data": {"id": knowledge_base_id, "files": list(self.knowledge_bases[knowledge_base_id])}}
+
+    def delete_document_from_knowledge_base(self, document_id, knowledge_base_id):
+        files = self.knowledge_bases[knowledge_base_id]
+        files[:] = [document for document in files if document["fileKey"] != document_id]
+        return {"ok": True}
+
+    def get_knowledge_base(self, knowledge_base_id):
+        files = self.knowledge_bases[knowledge_base_id] if self.list_documents else None
+        return {"data": {"id": knowledge_base_id, "status": "ready", "files": files}}
+
+
+def ingest(client, tmp_path, paths):
+    return asyncio.run(Ingestor(client, IngestionLedger(tmp_path / "ledger.json")).run(paths))
+
+
+def documents(tmp_path, contents):
+    directory = tmp_path / "docs"
+    directory.mkdir(exist_ok=True)
+    paths = []
+    for name, text in contents.items():
+        path = directory / name
+        path.write_text(text)
+        paths.append(path)
+    return paths
+
+
+def test_changed_seed_document_is_replaced(tmp_path):
+    for client in (FakeRivalz(), FakeRivalz(list_documents_on_create=False)):
+        paths = documents(tmp_path, {"a.pdf": "one", "b.pdf": "two"})
+        knowledge_base_id = ingest(client, tmp_path, paths)
+        paths[0].write_text("one, revised")
+        assert ingest(client, tmp_path, paths) == knowledge_base_id
+        names = sorted(document["name"] for document in client.knowledge_bases[knowledge_base_id])
+        assert names == ["a.pdf", "b.pdf"]
+        (tmp_path / "ledger.json").unlink()
+
+
+def test_seed_without_id_rebuilds_when_it_changes(tmp_path):
+    client = FakeRivalz(list_documents_on_create=False, list_documents=False)
+    paths = documents(tmp_path, {"a.pdf": "one", "b.pdf": "two"})
+    first = ingest(client, tmp_path, paths)
+    # Unchanged files reuse the knowledge base
+    assert ingest(client, tmp_path, paths) == first
+    paths[0].write_text("one, revised")
+    second = ingest(client, tmp_path, paths)
+    assert second != first
+    assert sorted(document["name"] for document in client.knowledge_bases[second]) == ["a.pdf", "b.pdf"]
+
+
+def test_changed_document_is_replaced(tmp_path):
+    client = FakeRivalz()
+    paths = documents(tmp_path, {"a.pdf": "one", "b.pdf": "two", "c.pdf": "three"})
+    knowledge_base_id = ingest(client, tmp_path, paths)
+    paths[1].write_text("two, revised")
+    paths[2].unlink()
+    assert ingest(client, tmp_path, paths[:2]) == knowledge_base_id
+    assert sorted(document["name"] for document in client.knowledge_bases[knowledge_base_id]) == ["a.pdf", "b.pdf"]
+    assert len(client.knowledge_bases[knowledge_base_id]) == 2
+
+
+def test_identical_files_are_ingested_once(tmp_path):
+    client = FakeRivalz()
+    paths = documents(tmp_path, {"a.pdf": "one", "b.pdf": "two", "copy.pdf": "two"})
+    knowledge_base_id = ingest(client, tmp_path, paths)
+    assert sorted(client.uploads) == ["a.pdf", "b.pdf"]
+    assert len(client.knowledge_bases[knowledge_base_id]) == 2
+
+
+def test_rerun_resumes_a_partial_ingest(tmp_path):
+    client = FakeRivalz()
+    paths = documents(tmp_path, {"a.pdf": "one", "b.pdf": "two", "c.pdf": "three"})
+    client.failing = {"b.pdf"}
+    knowledge_base_id = ingest(client, tmp_path, paths)
+    assert [document["name"] for document in client.knowledge_bases[knowledge_base_id]] == ["a.pdf", "c.pdf"]
+    # The next run only redoes what failed, in the same knowledge base
+    client.failing = set()
+    assert ingest(client, tmp_path, paths) == knowledge_base_id
+    assert sorted(document["name"] for document in client.knowledge_bases[knowledge_base_id]) == [
+        "a.pdf",
+        "b.pdf",
+        "c.pdf",
+    ]
+    assert sorted(client.uploads) == ["a.pdf", "b.pdf", "c.pdf"]
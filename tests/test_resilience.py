@@ -0,0 +1,130 @@
+import httpx
+import pytest
+
+from src.services.http import HTTPClient
+from src.services.resilience import CircuitBreaker, RateLimitExceeded, UpstreamGuard
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr("src.services.resilience.time.monotonic", lambda: now[0])
+    return now
+
+
+def open_guard(**kwargs) -> UpstreamGuard:
+    guard = UpstreamGuard("api.example.com", failure_threshold=1, reset_timeout=30, **kwargs)
+    guard.after_response(ok=False)
+    assert guard.breaker.state == "open"
+    return guard
+
+
+def test_rate_limited_probe_does_not_leave_the_circuit_half_open(clock):
+    guard = open_guard(rate_per_minute=60, burst=1, max_wait=0)
+    clock[0] = 30
+    guard.bucket.acquire()
+    with pytest.raises(RateLimitExceeded):
+        guard.before_request()
+    assert guard.breaker.state == "open"
+    clock[0] = 31
+    guard.before_request()
+    guard.after_response(ok=True)
+    assert guard.breaker.state == "closed"
+
+
+def test_probe_that_raises_is_released(clock):
+    guard = open_guard(rate_per_minute=6000)
+    clock[0] = 30
+
+    def handler(request):
+        raise RuntimeError("boom")
+
+    client = HTTPClient(guards=[guard], retries=0)
+    client._client = httpx.Client(transport=httpx.MockTransport(handler))
+    with pytest.raises(RuntimeError):
+        client.get("https://api.example.com/ping")
+    assert guard.breaker.state == "open"
+    assert guard.breaker.allow()
+
+
+def test_unresolved_probe_times_out(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock[0] = 30
+    assert breaker.allow()
+    assert not breaker.allow()
+    clock[0] = 60
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    slept = []
+    monkeypatch.setattr("src.services.http.time.sleep", slept.append)
+    return slept
+
+
+def mock_client(responses, **kwargs) -> tuple:
+    # HTTPClient answering from `responses` in order; exceptions are raised
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    client = HTTPClient(**kwargs)
+    client._client = httpx.Client(transport=httpx.MockTransport(handler))
+    return client, requests
+
+
+def test_transport_errors_and_retryable_statuses_are_retried(sleeps):
+    client, requests = mock_client(
+        [httpx.ConnectError("refused"), httpx.Response(503), httpx.Response(200, json={"ok": True})],
+        retries=2,
+        backoff=0.5,
+    )
+    assert client.get("https://api.example.com/ping").json() == {"ok": True}
+    assert len(requests) == 3
+    # Full jitter: each delay is at most the exponential backoff for its attempt
+    assert len(sleeps) == 2 and 0 <= sleeps[0] <= 0.5 and 0 <= sleeps[1] <= 1.0
+
+
+def test_retry_after_is_honoured_and_capped(sleeps):
+    client, _ = mock_client(
+        [
+            httpx.Response(429, headers={"Retry-After": "3"}),
+            httpx.Response(503, headers={"Retry-After": "120"}),
+            httpx.Response(200),
+        ],
+        retries=2,
+        max_backoff=8,
+    )
+    client.get("https://api.example.com/ping")
+    assert sleeps == [3.0, 8.0]
+
+
+def test_errors_are_raised_once_retries_are_used_up(sleeps):
+    client, requests = mock_client([httpx.Response(503), httpx.Response(503)], retries=1)
+    with pytest.raises(httpx.HTTPStatusError):
+        client.get("https://api.example.com/ping")
+    assert len(requests) == 2
+
+    sleeps.clear()
+    client, requests = mock_client([httpx.Response(404)], retries=3)
+    with pytest.raises(httpx.HTTPStatusError):
+        client.get("https://api.example.com/ping")
+    assert len(requests) == 1 and not sleeps
+
+
+def test_retry_after_holds_the_guard(sleeps, clock):
+    guard = UpstreamGuard("api.example.com", rate_per_minute=6000)
+    client, _ = mock_client([httpx.Response(429, headers={"Retry-After": "30"})], guards=[guard], retries=0)
+    with pytest.raises(httpx.HTTPStatusError):
+        client.get("https://api.example.com/ping")
+    with pytest.raises(RateLimitExceeded):
+        guard.before_request()
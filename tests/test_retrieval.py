@@ -0,0 +1,55 @@
+from src.services.retrieval import RivalzRetriever
+
+
+def test_rivalz_retriever_waits_for_the_knowledge_base_to_be_ready():
+    state = {"knowledge_base_id": None, "ready": False}
+    retriever = RivalzRetriever(
+        get_client=lambda: None,
+        get_knowledge_base_id=lambda: state["knowledge_base_id"],
+        get_ready=lambda: state["ready"],
+    )
+    assert not retriever.ready()
+    # Created but still indexing
+    state["knowledge_base_id"] = "kb-1"
+    assert not retriever.ready()
+    state["ready"] = True
+    assert retriever.ready()
+
+
+class FakeChatClient:
+    # Rivalz chat sessions; ids in `rejected` are refused like expired sessions
+
+    def __init__(self):
+        self.calls = []
+        self.rejected = set()
+
+    def create_chat_session(self, knowledge_base_id, message, chat_session_id=None):
+        self.calls.append(chat_session_id)
+        if chat_session_id in self.rejected:
+            raise RuntimeError("session not found")
+        session_id = chat_session_id or f"session-{len(self.calls)}"
+        return {"data": {"sessionId": session_id}, "response": f"answer to {message}", "context": []}
+
+
+def test_rivalz_retriever_reuses_and_replaces_chat_sessions():
+    client = FakeChatClient()
+    conversation = {"id": "a"}
+    retriever = RivalzRetriever(
+        get_client=lambda: client,
+        get_knowledge_base_id=lambda: "kb-1",
+        get_conversation_id=lambda: conversation["id"],
+    )
+    retriever.query("first")
+    retriever.query("follow-up")
+    assert client.calls == [None, "session-1"]
+    # Another conversation gets its own session
+    conversation["id"] = "b"
+    retriever.query("other")
+    assert client.calls[-1] is None
+    # A rejected session is replaced once and the new one is kept
+    conversation["id"] = "a"
+    client.rejected.add("session-1")
+    assert retriever.query("again")["response"] == "answer to again"
+    assert client.calls[-2:] == ["session-1", None]
+    retriever.query("and again")
+    assert client.calls[-1] == "session-5"
@@ -0,0 +1,44 @@
+import pytest
+
+from src.services.semantic_cache import SemanticCache
+
+
+@pytest.mark.parametrize("cached, query", [
+    ("How do I stake?", "How can I stake?"),
+    ("What is Rivalz?", "What's Rivalz?"),
+    ("How do I stake RIZ tokens?", "how can i stake riz tokens"),
+])
+def test_paraphrases_match(cached, query):
+    cache = SemanticCache()
+    cache.set(cached, "v1", "answer")
+    assert cache.get(query, "v1") == "answer"
+
+
+@pytest.mark.parametrize("cached, query", [
+    ("How do I stake?", "When can I stake?"),
+    ("How do I stake?", "Why should I stake?"),
+    ("How do I stake?", "Where do I stake?"),
+    ("What is Rivalz?", "Who is Rivalz?"),
+    ("What is Rivalz?", "Where is Rivalz?"),
+])
+def test_different_questions_do_not_match(cached, query):
+    cache = SemanticCache()
+    cache.set(cached, "v1", "answer")
+    assert cache.get(query, "v1") is None
+
+
+def test_new_version_empties_the_cache():
+    cache = SemanticCache()
+    cache.set("How do I stake?", "v1", "answer")
+    assert cache.get("How do I stake?", "v2") is None
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_scoped_answers_are_not_shared():
+    cache = SemanticCache()
+    cache.set("How do I stake?", "v1", "answer in A", scope="conversation-a")
+    assert cache.get("How do I stake?", "v1", scope="conversation-a") == "answer in A"
+    assert cache.get("How do I stake?", "v1", scope="conversation-b") is None
+    assert cache.get("How do I stake?", "v1") is None
+    cache.set("How do I stake?", "v1", "answer in B", scope="conversation-b")
+    assert cache.get("How do I stake?", "v1", scope="conversation-a") == "answer in A"
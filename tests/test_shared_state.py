@@ -0,0 +1,58 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from src.services import shared_state
+from src.services.shared_state import LeaderLock, SharedState
+
+pytestmark = pytest.mark.skipif(shared_state.fcntl is None, reason="needs flock")
+
+HOLD_LOCK = """
+import sys
+from src.services.shared_state import LeaderLock
+lock = LeaderLock(sys.argv[1])
+print(lock.acquire(), flush=True)
+sys.stdin.read()
+"""
+
+
+def test_follower_takes_over_from_a_released_leader(tmp_path):
+    leader, follower = LeaderLock(tmp_path / "leader.lock"), LeaderLock(tmp_path / "leader.lock")
+    assert leader.acquire()
+    assert not follower.acquire()
+    assert leader.acquire()
+    leader.release()
+    assert follower.acquire() and follower.held
+    assert not leader.acquire()
+
+
+def test_follower_takes_over_from_a_dead_leader(tmp_path):
+    path = tmp_path / "leader.lock"
+    leader = subprocess.Popen(
+        [sys.executable, "-c", HOLD_LOCK, str(path)],
+        cwd=Path(__file__).parents[1],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        assert leader.stdout.readline().strip() == "True"
+        follower = LeaderLock(path)
+        assert not follower.acquire()
+        leader.kill()
+        leader.wait(timeout=5)
+        # The OS released the dead leader's lock
+        assert follower.acquire()
+        assert path.read_text().strip() == str(os.getpid())
+    finally:
+        leader.kill()
+        leader.wait(timeout=5)
+
+
+def test_shared_state_round_trips_between_instances(tmp_path):
+    SharedState(str(tmp_path / "state.db")).set("knowledge_base_id", {"id": "kb-1"})
+    assert SharedState(str(tmp_path / "state.db")).get("knowledge_base_id") == {"id": "kb-1"}
+    assert SharedState(str(tmp_path / "state.db")).get("missing", "default") == "default"
@@ -0,0 +1,54 @@
+import numpy as np
+
+from src.services.tvl_analytics import TVLSeries
+from src.services.tvl_store import TVLStore
+
+START = 1_700_000_000 // 3600 * 3600
+
+
+def chains(tvl: float) -> list:
+    return [{"name": "Ethereum", "tvl": tvl}, {"name": "Solana", "tvl": tvl / 10}]
+
+
+def test_history_is_downsampled_in_sql(tmp_path):
+    store = TVLStore(str(tmp_path / "tvl.db"))
+    # Four snapshots an hour for six hours
+    for step in range(24):
+        store.record(chains(100.0 + step), ts=START + step * 900)
+    rows = list(store.history(resolution=3600))
+    assert [ts for ts, _, _ in rows[::2]] == [START + hour * 3600 for hour in range(6)]
+    assert len(list(store.history())) == 48
+
+    series = TVLSeries()
+    assert series.load(store.history(resolution=3600)) == 6
+    assert series.last_ts == START + 5 * 3600
+    ts, names, values, _ = series.window()
+    assert names == ["Ethereum", "Solana"]
+    np.testing.assert_allclose(values[:, 0], [100.0, 104.0, 108.0, 112.0, 116.0, 120.0])
+
+
+def test_load_matches_raw_history(tmp_path):
+    store = TVLStore(str(tmp_path / "tvl.db"))
+    for step in range(10):
+        store.record(chains(50.0 + step) if step % 3 else chains(50.0 + step)[:1], ts=START + step * 1800)
+    downsampled, raw = TVLSeries(), TVLSeries()
+    downsampled.load(store.history(resolution=3600))
+    raw.load(store.history())
+    for left, right in zip(downsampled.window(), raw.window()):
+        np.testing.assert_array_equal(left, right)
+
+
+def test_old_snapshots_are_deleted(tmp_path):
+    store = TVLStore(str(tmp_path / "tvl.db"), retention_hours=24 * 10)
+    for day in range(20):
+        store.record(chains(100.0), ts=START + day * 86400)
+    oldest = min(ts for ts, _, _ in store.history())
+    assert oldest == START + 9 * 86400
+    # The 7 day deltas still have their baseline
+    assert "168.0h" in store.chain("Ethereum")["change_pct"]
+
+
+def test_malformed_chains_are_skipped(tmp_path):
+    store = TVLStore(str(tmp_path / "tvl.db"))
+    payload = chains(100.0) + [None, "Bitcoin", {"name": "Tron"}, {"name": "Base", "tvl": "n/a"}]
+    assert store.record(payload, ts=START) == {"Ethereum": 100.0, "Solana": 10.0}